@@ -5,18 +5,86 @@ Clean, lightweight alternative to Streamlit with SQLite database
 
 from flask import Flask, render_template, request, jsonify
 import pandas as pd
+import hashlib
 import sqlite3
 import os
 from datetime import datetime
 from pathlib import Path
+from web_common import VersionedCache, conditional_response, encode_payload, gzip_stream, use_fast_json
+
+try:
+    import waitress  # Optional: multithreaded production WSGI server
+except ImportError:
+    waitress = None
+
 
 app = Flask(__name__)
+use_fast_json(app)
 
 # Configuration
 DB_PATH = 'market_data.db'
 CSV_FILE = 'capital_markets_analysis.csv'
+PARQUET_FILE = 'capital_markets_analysis.parquet'
+
+# /api/markets field names and the markets columns they come from. The intraday
+# columns aren't stored by every schema and are returned as null when missing.
+API_MARKET_FIELDS = [
+    ('id', 'id'), ('Category', 'category'), ('Symbol', 'symbol'), ('Name', 'name'),
+    ('Current Price', 'current_price'), ('Currency', 'currency'),
+    ('perf_30m', 'perf_30m_pct'), ('perf_1h', 'perf_1h_pct'), ('perf_4h', 'perf_4h_pct'),
+    ('perf_6h', 'perf_6h_pct'), ('perf_1d', 'perf_1d_pct'), ('perf_1w', 'perf_1w_pct'),
+    ('perf_1m', 'perf_1m_pct'), ('perf_3m', 'perf_3m_pct'), ('perf_6m', 'perf_6m_pct'),
+    ('perf_ytd', 'perf_ytd_pct'), ('perf_1y', 'perf_1y_pct'), ('perf_5y', 'perf_5y_pct'),
+    ('perf_10y', 'perf_10y_pct')
+]
+
+# Performance column for each /api/top-performers timeframe
+PERF_COLUMNS_BY_TIMEFRAME = {
+    '30M': 'perf_30m_pct',
+    '1H': 'perf_1h_pct',
+    '4H': 'perf_4h_pct',
+    '6H': 'perf_6h_pct',
+    '1D': 'perf_1d_pct',
+    '1W': 'perf_1w_pct',
+    '1M': 'perf_1m_pct',
+    '3M': 'perf_3m_pct',
+    '6M': 'perf_6m_pct',
+    'YTD': 'perf_ytd_pct',
+    '1Y': 'perf_1y_pct',
+    '5Y': 'perf_5y_pct',
+    '10Y': 'perf_10y_pct'
+}
+
+# Seconds browsers may reuse an API response before revalidating it
+API_MAX_AGE = 30
+
+# Worker threads handling requests concurrently
+SERVER_THREADS = 8
+
+# Markets serialized per chunk of a streamed /api/markets response
+STREAM_BATCH_ROWS = 500
+
+# Values derived from the database, recomputed when the file changes
+db_cache = VersionedCache(DB_PATH)
 
 
+def api_response(body, etag, encoded=None, mimetype='application/json'):
+    """Wrap an API body with this app's caching headers, answering 304 when the ETag matches"""
+    return conditional_response(body, etag, mimetype, encoded,
+                                public=True, max_age=API_MAX_AGE, must_revalidate=True)
+
+
+def cached_json(key, build):
+    """
+    Serve a JSON payload serialized and compressed once per database version
+    
+    Args:
+        key: Cache key for this payload
+        build: Called with no arguments, returns the payload
+    """
+    etag, body, encoded = db_cache.get(('json', key), lambda: encode_payload(jsonify(build()).get_data()))
+    return api_response(body, etag, encoded)
+
 def init_db():
     """Initialize SQLite database"""
     conn = sqlite3.connect(DB_PATH)
@@ -57,55 +125,91 @@ def init_db():
     conn.close()
 
 
+def find_export(csv_file):
+    """
+    Return the analyzer's CSV export path, or its gzip variant ('.gz'), or None
+    
+    When both exist (CSV_COMPRESSION was changed between runs) the newer
+    one is returned, so a stale export never shadows the latest run.
+    """
+    existing = [path for path in (csv_file, csv_file + '.gz') if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+
+def read_export(csv_file, columns=None):
+    """
+    Read the analyzer export, preferring the Parquet sidecar
+    
+    The sidecar is typed and columnar, so it loads much faster than
+    re-parsing the CSV, and only the requested columns are read from it.
+    It is only used when at least as new as the CSV.
+    The CSV itself is read as plain strings (the importer parses the
+    percentages itself), with the multithreaded pyarrow tokenizer when
+    pyarrow is installed; a '.gz' export is decompressed on the fly.
+    """
+    if (os.path.exists(PARQUET_FILE) and
+            os.path.getmtime(PARQUET_FILE) >= os.path.getmtime(csv_file)):
+        try:
+            return pd.read_parquet(PARQUET_FILE, columns=columns)
+        except Exception as e:
+            print(f"Error reading {PARQUET_FILE}, falling back to CSV: {e}")
+    try:
+        return pd.read_csv(csv_file, engine='pyarrow', dtype=str, compression='infer')
+    except ImportError:
+        return pd.read_csv(csv_file, dtype=str, compression='infer')
+
+
+# Export columns in markets-table order, flagged True when parsed as numbers
+IMPORT_COLUMNS = [
+    ('Category', False), ('Symbol', False), ('Name', False),
+    ('Current Price', True), ('Currency', False), ('Price Change %', True),
+    ('Perf % 1W', True), ('Perf % 1M', True), ('Perf % 3M', True),
+    ('Perf % 6M', True), ('Perf % YTD', True), ('Perf % 1Y', True),
+    ('Perf % 5Y', True), ('Perf % 10Y', True),
+    ('Market Status', False), ('Type', False)
+]
+
+
+def parse_pct_column(df, col):
+    """Parse a column like "1.23%" to floats; "N/A", blanks and bad values become NaN"""
+    if col not in df.columns:
+        return pd.Series(float('nan'), index=df.index)
+    values = df[col]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype(str).str.replace('%', '', regex=False).str.strip()
+    return pd.to_numeric(text, errors='coerce')
+
+
 def import_csv_to_db(csv_file):
-    """Import CSV data into SQLite"""
-    if not os.path.exists(csv_file):
+    """Import CSV data (plain or gzip-compressed) into SQLite"""
+    csv_file = find_export(csv_file)
+    if csv_file is None:
         return False
     
     try:
-        df = pd.read_csv(csv_file)
+        df = read_export(csv_file, columns=[col for col, _ in IMPORT_COLUMNS])
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
         # Clear existing data
         cursor.execute('DELETE FROM markets')
         
-        for _, row in df.iterrows():
-            def parse_pct(val):
-                if pd.isna(val) or val == 'N/A':
-                    return None
-                if isinstance(val, str):
-                    try:
-                        return float(val.replace('%', '').strip())
-                    except (ValueError, AttributeError):
-                        return None
-                return float(val)
-            
-            cursor.execute('''
-                INSERT INTO markets (
-                    category, symbol, name, current_price, currency,
-                    price_change_pct, perf_1w_pct, perf_1m_pct, perf_3m_pct,
-                    perf_6m_pct, perf_ytd_pct, perf_1y_pct, perf_5y_pct,
-                    perf_10y_pct, market_status, type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row.get('Category', ''),
-                row.get('Symbol', ''),
-                row.get('Name', ''),
-                parse_pct(row.get('Current Price', None)),
-                row.get('Currency', ''),
-                parse_pct(row.get('Price Change %', None)),
-                parse_pct(row.get('Perf % 1W', None)),
-                parse_pct(row.get('Perf % 1M', None)),
-                parse_pct(row.get('Perf % 3M', None)),
-                parse_pct(row.get('Perf % 6M', None)),
-                parse_pct(row.get('Perf % YTD', None)),
-                parse_pct(row.get('Perf % 1Y', None)),
-                parse_pct(row.get('Perf % 5Y', None)),
-                parse_pct(row.get('Perf % 10Y', None)),
-                row.get('Market Status', ''),
-                row.get('Type', '')
-            ))
+        # Parse every column in one vectorized pass, then insert all rows at once
+        frame = pd.DataFrame({
+            col: parse_pct_column(df, col) if numeric else df.get(col, pd.Series('', index=df.index))
+            for col, numeric in IMPORT_COLUMNS
+        }).astype(object)
+        frame = frame.where(frame.notna(), None)
+        
+        cursor.executemany('''
+            INSERT INTO markets (
+                category, symbol, name, current_price, currency,
+                price_change_pct, perf_1w_pct, perf_1m_pct, perf_3m_pct,
+                perf_6m_pct, perf_ytd_pct, perf_1y_pct, perf_5y_pct,
+                perf_10y_pct, market_status, type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', frame.itertuples(index=False, name=None))
         
         # Update metadata
         cursor.execute('DELETE FROM metadata WHERE key = ?', ('last_fetch_time',))
@@ -116,6 +220,9 @@ def import_csv_to_db(csv_file):
         
         conn.commit()
         conn.close()
+        
+        # Drop cached reads even if the rewrite kept the same mtime and size
+        db_cache.clear()
         return True
     except Exception as e:
         print(f"Error importing CSV: {e}")
@@ -123,7 +230,12 @@ def import_csv_to_db(csv_file):
 
 
 def get_last_fetch_time():
-    """Get last data fetch timestamp"""
+    """Get last data fetch timestamp (read once per database version)"""
+    return db_cache.get('last_fetch_time', query_last_fetch_time)
+
+
+def query_last_fetch_time():
+    """Read the last data fetch timestamp from the metadata table"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
@@ -136,7 +248,14 @@ def get_last_fetch_time():
 
 
 def load_markets_from_db(category=None, search=None):
-    """Load markets from SQLite"""
+    """Load markets from SQLite (the unfiltered list is cached per database version)"""
+    if (not category or category == 'All') and not search:
+        return db_cache.get('markets', query_markets)
+    return query_markets(category, search)
+
+
+def query_markets(category=None, search=None):
+    """Query markets from SQLite, optionally filtered by category and name/symbol"""
     try:
         conn = sqlite3.connect(DB_PATH)
         conn.row_factory = sqlite3.Row
@@ -164,7 +283,12 @@ def load_markets_from_db(category=None, search=None):
 
 
 def get_categories():
-    """Get all categories"""
+    """Get all categories (read once per database version)"""
+    return db_cache.get('categories', query_categories)
+
+
+def query_categories():
+    """Query the distinct categories from SQLite"""
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
@@ -176,25 +300,20 @@ def get_categories():
         return ['All']
 
 
+def resolve_timeframe(timeframe):
+    """Return timeframe if it is a known PERF_COLUMNS_BY_TIMEFRAME key, else '1M'"""
+    return timeframe if timeframe in PERF_COLUMNS_BY_TIMEFRAME else '1M'
+
+
 def get_top_performers(timeframe):
-    """Get top performers by category for a timeframe"""
-    perf_col_map = {
-        '30M': 'perf_30m_pct',
-        '1H': 'perf_1h_pct',
-        '4H': 'perf_4h_pct',
-        '6H': 'perf_6h_pct',
-        '1D': 'perf_1d_pct',
-        '1W': 'perf_1w_pct',
-        '1M': 'perf_1m_pct',
-        '3M': 'perf_3m_pct',
-        '6M': 'perf_6m_pct',
-        'YTD': 'perf_ytd_pct',
-        '1Y': 'perf_1y_pct',
-        '5Y': 'perf_5y_pct',
-        '10Y': 'perf_10y_pct'
-    }
-    
-    col_name = perf_col_map.get(timeframe, 'perf_1m_pct')
+    """Get top performers by category for a timeframe (computed once per database version)"""
+    timeframe = resolve_timeframe(timeframe)
+    return db_cache.get(('top_performers', timeframe), lambda: query_top_performers(timeframe))
+
+
+def query_top_performers(timeframe):
+    """Query the top 5 performers of each category for a timeframe"""
+    col_name = PERF_COLUMNS_BY_TIMEFRAME[timeframe]
     
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -202,27 +321,26 @@ def get_top_performers(timeframe):
         cursor = conn.cursor()
         
         cursor.execute('SELECT DISTINCT category FROM markets ORDER BY category')
-        categories = [row[0] for row in cursor.fetchall()]
+        top_performers = {row[0]: [] for row in cursor.fetchall()}
         
-        top_performers = {}
-        for category in categories:
-            cursor.execute(f'''
-                SELECT name, symbol, {col_name} as perf
+        # One pass ranks every category; only the top 5 per category are returned
+        cursor.execute(f'''
+            SELECT category, name, symbol, perf FROM (
+                SELECT category, name, symbol, {col_name} AS perf,
+                       ROW_NUMBER() OVER (PARTITION BY category ORDER BY {col_name} DESC) AS rank
                 FROM markets
-                WHERE category = ? AND {col_name} IS NOT NULL
-                ORDER BY {col_name} DESC
-                LIMIT 5
-            ''', (category,))
-            
-            performers = []
-            for row in cursor.fetchall():
-                performers.append({
-                    'name': row['name'],
-                    'symbol': row['symbol'],
-                    'performance': f"{row['perf']:.2f}%" if row['perf'] is not None else 'N/A'
-                })
-            
-            top_performers[category] = performers
+                WHERE {col_name} IS NOT NULL
+            )
+            WHERE rank <= 5
+            ORDER BY category, rank
+        ''')
+        
+        for row in cursor.fetchall():
+            top_performers[row['category']].append({
+                'name': row['name'],
+                'symbol': row['symbol'],
+                'performance': f"{row['perf']:.2f}%"
+            })
         
         conn.close()
         return top_performers
@@ -231,17 +349,17 @@ def get_top_performers(timeframe):
         return {}
 
 
-@app.route('/')
-def index():
-    """Main dashboard"""
+def get_dashboard_stats():
+    """Dashboard statistics, computed once per database version (None without data)"""
+    return db_cache.get('dashboard_stats', compute_dashboard_stats)
+
+
+def compute_dashboard_stats():
+    """Count markets and categories and find the best 1M performer"""
     markets = load_markets_from_db()
-    
     if not markets:
-        return render_template('index.html', 
-                             error='No data available. Please run run_analyzer.py first.',
-                             stats={})
+        return None
     
-    # Calculate statistics
     stats = {
         'total_markets': len(markets),
         'total_categories': len(set(m['category'] for m in markets)),
@@ -258,57 +376,65 @@ def index():
             'value': f"{best['perf_1m_pct']:.2f}%"
         }
     
+    return stats
+
+
+@app.route('/')
+def index():
+    """Main dashboard"""
+    stats = get_dashboard_stats()
+    
+    if not stats:
+        return render_template('index.html', 
+                             error='No data available. Please run run_analyzer.py first.',
+                             stats={})
+    
     return render_template('index.html', stats=stats)
 
 
 @app.route('/api/markets')
 def api_markets():
-    """API endpoint for market data"""
+    """API endpoint for market data, streamed (gzipped when accepted) as a JSON list in batches of rows"""
     category = request.args.get('category', 'All')
     search = request.args.get('search', '').lower()
     
     markets = load_markets_from_db(category if category != 'All' else None, search)
+    dumps = app.json.dumps
+    
+    def generate():
+        yield '['
+        for start in range(0, len(markets), STREAM_BATCH_ROWS):
+            batch = markets[start:start + STREAM_BATCH_ROWS]
+            rows = ','.join(
+                dumps({field: m.get(column) for field, column in API_MARKET_FIELDS}, separators=(',', ':'))
+                for m in batch
+            )
+            yield rows if start == 0 else ',' + rows
+        yield ']'
     
-    return jsonify([{
-        'id': m['id'],
-        'Category': m['category'],
-        'Symbol': m['symbol'],
-        'Name': m['name'],
-        'Current Price': m['current_price'],
-        'Currency': m['currency'],
-        'perf_30m': m['perf_30m_pct'],
-        'perf_1h': m['perf_1h_pct'],
-        'perf_4h': m['perf_4h_pct'],
-        'perf_6h': m['perf_6h_pct'],
-        'perf_1d': m['perf_1d_pct'],
-        'perf_1w': m['perf_1w_pct'],
-        'perf_1m': m['perf_1m_pct'],
-        'perf_3m': m['perf_3m_pct'],
-        'perf_6m': m['perf_6m_pct'],
-        'perf_ytd': m['perf_ytd_pct'],
-        'perf_1y': m['perf_1y_pct'],
-        'perf_5y': m['perf_5y_pct'],
-        'perf_10y': m['perf_10y_pct']
-    } for m in markets])
+    # Streamed, so the ETag comes from the database version and query, not the body
+    etag = hashlib.md5(repr((db_cache.version(), category, search)).encode('utf-8')).hexdigest()
+    # Generators are lazy: only the variant the client negotiates is ever run
+    return api_response(generate(), etag, {'gzip': gzip_stream(generate())})
 
 
 @app.route('/api/categories')
 def api_categories():
     """Get list of categories"""
-    return jsonify(get_categories())
+    return cached_json('categories', get_categories)
 
 
 @app.route('/api/top-performers')
 def api_top_performers():
     """Get top performers by category"""
-    timeframe = request.args.get('timeframe', '1M')
-    return jsonify(get_top_performers(timeframe))
+    timeframe = resolve_timeframe(request.args.get('timeframe', '1M'))
+    return cached_json(('top_performers', timeframe), lambda: get_top_performers(timeframe))
 
 
 @app.route('/api/stats')
 def api_stats():
     """Get statistics"""
-    return jsonify({
+    return cached_json('stats', lambda: {
         'last_fetch': get_last_fetch_time()
     })
 
@@ -318,10 +444,14 @@ if __name__ == '__main__':
     init_db()
     
     # Import CSV data if available
-    if os.path.exists(CSV_FILE):
-        import_csv_to_db(CSV_FILE)
-        print(f"✓ Data imported from {CSV_FILE}")
+    export_file = find_export(CSV_FILE)
+    if export_file:
+        import_csv_to_db(export_file)
+        print(f"✓ Data imported from {export_file}")
     
     print("Starting Capital.com Market Analyzer Web App")
     print("Access at: http://localhost:5000")
-    app.run(debug=False, host='localhost', port=5000)
+    if waitress is not None:
+        waitress.serve(app, host='localhost', port=5000, threads=SERVER_THREADS)
+    else:
+        app.run(debug=False, host='localhost', port=5000, threaded=True)
@@ -0,0 +1,135 @@
+"""
+File-backed TTL cache for Capital.com API responses
+Entries are stored as JSON under {root}/{epic}/{endpoint}-{md5(params)}.json
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FileCache:
+    """JSON file cache with a timestamp envelope per entry"""
+
+    def __init__(self, root: str = '.cache'):
+        """
+        Initialize the cache
+
+        Args:
+            root: Directory that holds the cache files
+        """
+        self.root = root
+
+    def _path(self, epic: str, endpoint: str, params: Optional[Dict] = None) -> str:
+        """Build the file path for an (epic, endpoint, params) key"""
+        digest = hashlib.md5(json.dumps(params or {}, sort_keys=True).encode('utf-8')).hexdigest()
+        safe_epic = epic.replace(os.sep, '_')
+        return os.path.join(self.root, safe_epic, f"{endpoint}-{digest}.json")
+
+    def get(self, epic: str, endpoint: str, params: Optional[Dict] = None,
+            ttl: Optional[float] = None) -> Optional[Any]:
+        """
+        Return cached data, or None if missing or older than ttl seconds
+        """
+        path = self._path(epic, endpoint, params)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if ttl is not None and time.time() - entry.get('ts', 0) > ttl:
+            return None
+        return entry.get('data')
+
+    def set(self, epic: str, endpoint: str, data: Any, params: Optional[Dict] = None):
+        """Store data for a key, replacing any existing entry atomically"""
+        path = self._path(epic, endpoint, params)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'data': data}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def cached(self, endpoint: str, ttl: float,
+               cache_if: Callable[[Any], bool] = bool,
+               replace_if: Optional[Callable[[Any, Any], bool]] = None) -> Callable:
+        """
+        Decorator caching a function whose first argument is a market epic
+
+        The key is the epic plus any keyword arguments; extra positional
+        arguments are passed through but not part of the key.
+
+        Args:
+            endpoint: Name used in the cache file name
+            ttl: Maximum entry age in seconds
+            cache_if: Predicate deciding whether a fresh result is stored
+            replace_if: Called as replace_if(stale, fresh) when an expired
+                        entry exists; if it returns False the stale entry
+                        is kept and returned instead of the fresh result
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(epic, *args, **kwargs):
+                data = self.get(epic, endpoint, kwargs, ttl=ttl)
+                if data is not None:
+                    return data
+
+                data = func(epic, *args, **kwargs)
+                if not cache_if(data):
+                    return data
+
+                if replace_if is not None:
+                    stale = self.get(epic, endpoint, kwargs)
+                    if stale is not None and not replace_if(stale, data):
+                        return stale
+
+                self.set(epic, endpoint, data, kwargs)
+                return data
+            return wrapper
+        return decorator
+
+    def cached_batch(self, endpoint: str, ttl: float) -> Callable:
+        """
+        Decorator caching a function that maps a list of epics to {epic: data}
+
+        Only epics without a fresh entry are passed to the function, and
+        each returned entry is stored under the same key cached(endpoint)
+        uses for a single epic, so both paths share one cache.
+
+        Args:
+            endpoint: Name used in the cache file name
+            ttl: Maximum entry age in seconds
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(epics: List[str]) -> Dict[str, Any]:
+                found = {}
+                missing = []
+                for epic in epics:
+                    data = self.get(epic, endpoint, ttl=ttl)
+                    if data is not None:
+                        found[epic] = data
+                    else:
+                        missing.append(epic)
+
+                if missing:
+                    fresh = func(missing)
+                    for epic, data in fresh.items():
+                        if data:
+                            self.set(epic, endpoint, data)
+                    found.update(fresh)
+                return found
+            return wrapper
+        return decorator
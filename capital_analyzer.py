@@ -4,12 +4,52 @@ Fetches and categorizes market symbols with performance metrics
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import json
 
 
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Largest burst allowed; defaults to one second's worth
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """Hold back all callers for at least the given number of seconds"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
 class CapitalAPI:
     """Capital.com API client"""
     
@@ -22,7 +62,12 @@ class CapitalAPI:
         'etf': 'hierarchy_v1.etf_group',
     }
     
-    def __init__(self, api_key: str, identifier: str, password: str, demo: bool = True):
+    # Most epics the /markets?epics= endpoint accepts per request
+    MAX_EPICS_PER_REQUEST = 50
+    
+    def __init__(self, api_key: str, identifier: str, password: str, demo: bool = True,
+                 pool_size: int = 10, max_requests_per_second: float = 10,
+                 log: Callable[..., None] = print):
         """
         Initialize Capital.com API client
         
@@ -31,8 +76,13 @@ class CapitalAPI:
             identifier: Your username/email
             password: Your password
             demo: Use demo environment (True) or live (False)
+            pool_size: Keep-alive connections kept open; should be at least
+                       the number of threads sharing this client
+            max_requests_per_second: Sustained GET rate shared by all threads
+            log: Called like print() with each status message
         """
         self.api_key = api_key
+        self.log = log
         self.identifier = identifier
         self.password = password
         self.base_url = (
@@ -42,9 +92,16 @@ class CapitalAPI:
         self.cst = None
         self.security_token = None
         self.session_expiry = None
+        # Serializes session renewal when the client is shared across threads
+        self._session_lock = threading.Lock()
         # Create a session that ignores proxy environment variables
         self.session = requests.Session()
         self.session.trust_env = False  # Don't use proxy from environment variables
+        # Reuse TLS connections across calls instead of reconnecting per request
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        self.rate_limiter = TokenBucket(max_requests_per_second)
         
     def create_session(self) -> bool:
         """Create a new API session with retry logic"""
@@ -71,47 +128,85 @@ class CapitalAPI:
                     self.cst = response.headers.get('CST')
                     self.security_token = response.headers.get('X-SECURITY-TOKEN')
                     self.session_expiry = datetime.now() + timedelta(minutes=10)
-                    print("[OK] Session created successfully")
+                    self.log("[OK] Session created successfully")
                     return True
                 elif response.status_code >= 500:
                     # Server error - retry
                     if attempt < max_retries:
-                        print(f"[WARNING] Server error {response.status_code} (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
+                        self.log(f"[WARNING] Server error {response.status_code} (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
                         time.sleep(retry_delay)
                         continue
                     else:
-                        print(f"[ERROR] Session creation failed after {max_retries} attempts: {response.status_code}")
-                        print(f"Response: {response.text}")
+                        self.log(f"[ERROR] Session creation failed after {max_retries} attempts: {response.status_code}")
+                        self.log(f"Response: {response.text}")
                         return False
                 else:
                     # Client error - don't retry
-                    print(f"[ERROR] Session creation failed: {response.status_code}")
-                    print(f"Response: {response.text}")
+                    self.log(f"[ERROR] Session creation failed: {response.status_code}")
+                    self.log(f"Response: {response.text}")
                     return False
             except requests.exceptions.Timeout:
                 if attempt < max_retries:
-                    print(f"[WARNING] Request timeout (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
+                    self.log(f"[WARNING] Request timeout (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
                     time.sleep(retry_delay)
                     continue
                 else:
-                    print(f"[ERROR] Request timeout after {max_retries} attempts")
+                    self.log(f"[ERROR] Request timeout after {max_retries} attempts")
                     return False
             except Exception as e:
                 if attempt < max_retries:
-                    print(f"[WARNING] Error creating session: {str(e)} (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
+                    self.log(f"[WARNING] Error creating session: {str(e)} (attempt {attempt}/{max_retries}). Retrying in {retry_delay}s...")
                     time.sleep(retry_delay)
                     continue
                 else:
-                    print(f"[ERROR] Error creating session after {max_retries} attempts: {str(e)}")
+                    self.log(f"[ERROR] Error creating session after {max_retries} attempts: {str(e)}")
                     return False
         
         return False
     
+    def restore_session(self, cst: str, security_token: str) -> bool:
+        """
+        Adopt tokens from an earlier session, keeping them only if a ping succeeds
+        
+        Returns:
+            True if the tokens are still valid, False if a new login is needed
+        """
+        self.cst = cst
+        self.security_token = security_token
+        self.session_expiry = datetime.now() + timedelta(minutes=10)
+        if self.ping():
+            return True
+        
+        self.cst = None
+        self.security_token = None
+        self.session_expiry = None
+        return False
+    
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the rate limiter, waiting out 429 responses per Retry-After"""
+        max_retries = 3
+        
+        for attempt in range(1, max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, **kwargs)
+            if response.status_code != 429 or attempt == max_retries:
+                return response
+            
+            try:
+                retry_after = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                retry_after = 1.0
+            self.log(f"[WARNING] Rate limited (attempt {attempt}/{max_retries}). Retrying in {retry_after}s...")
+            self.rate_limiter.pause(retry_after)
+        
+        return response
+    
     def ensure_session(self):
         """Ensure we have a valid session, create if needed"""
-        if not self.cst or not self.session_expiry or datetime.now() >= self.session_expiry:
-            return self.create_session()
-        return True
+        with self._session_lock:
+            if not self.cst or not self.session_expiry or datetime.now() >= self.session_expiry:
+                return self.create_session()
+            return True
     
     def ping(self) -> bool:
         """Ping the service to keep session alive"""
@@ -122,7 +217,7 @@ class CapitalAPI:
         headers = self._get_auth_headers()
         
         try:
-            response = self.session.get(url, headers=headers)
+            response = self._get(url, headers=headers)
             if response.status_code == 200:
                 self.session_expiry = datetime.now() + timedelta(minutes=10)
                 return True
@@ -155,7 +250,7 @@ class CapitalAPI:
         
         node_id = self.CATEGORY_NODE_IDS.get(category.lower())
         if not node_id:
-            print(f"[ERROR] Unknown category: {category}")
+            self.log(f"[ERROR] Unknown category: {category}")
             return []
         
         all_markets = []
@@ -179,7 +274,7 @@ class CapitalAPI:
                 # Retry logic for individual node fetches
                 for attempt in range(1, max_retries + 1):
                     try:
-                        response = self.session.get(url, headers=headers, params={"limit": limit}, timeout=10)
+                        response = self._get(url, headers=headers, params={"limit": limit}, timeout=10)
                         
                         if response.status_code == 200:
                             data = response.json()
@@ -200,11 +295,11 @@ class CapitalAPI:
                         elif response.status_code >= 500:
                             # Server error - retry
                             if attempt < max_retries:
-                                print(f"[WARNING] Server error {response.status_code} fetching {current_node} (attempt {attempt}/{max_retries}). Retrying...")
+                                self.log(f"[WARNING] Server error {response.status_code} fetching {current_node} (attempt {attempt}/{max_retries}). Retrying...")
                                 time.sleep(retry_delay)
                                 continue
                             else:
-                                print(f"[WARNING] Skipping {current_node} after {max_retries} failed attempts")
+                                self.log(f"[WARNING] Skipping {current_node} after {max_retries} failed attempts")
                                 break
                         else:
                             # Client error or other - skip this node
@@ -212,18 +307,16 @@ class CapitalAPI:
                     
                     except requests.exceptions.Timeout:
                         if attempt < max_retries:
-                            print(f"[WARNING] Timeout fetching {current_node} (attempt {attempt}/{max_retries}). Retrying...")
+                            self.log(f"[WARNING] Timeout fetching {current_node} (attempt {attempt}/{max_retries}). Retrying...")
                             time.sleep(retry_delay)
                             continue
                         else:
-                            print(f"[WARNING] Skipping {current_node} after timeout")
+                            self.log(f"[WARNING] Skipping {current_node} after timeout")
                             break
                     
                     except Exception as e:
-                        print(f"[WARNING] Error fetching {current_node}: {str(e)}")
+                        self.log(f"[WARNING] Error fetching {current_node}: {str(e)}")
                         break
-                
-                time.sleep(0.05)  # Rate limiting
             
             # Remove duplicates based on epic
             seen_epics = set()
@@ -234,11 +327,11 @@ class CapitalAPI:
                     seen_epics.add(epic)
                     unique_markets.append(market)
             
-            print(f"[OK] Found {len(unique_markets)} unique markets in {category}")
+            self.log(f"[OK] Found {len(unique_markets)} unique markets in {category}")
             return unique_markets
             
         except Exception as e:
-            print(f"[ERROR] Error fetching {category}: {str(e)}")
+            self.log(f"[ERROR] Error fetching {category}: {str(e)}")
             return []
     
     def get_market_details(self, epic: str) -> Optional[Dict]:
@@ -254,7 +347,7 @@ class CapitalAPI:
         
         for attempt in range(1, max_retries + 1):
             try:
-                response = self.session.get(url, headers=headers, timeout=10)
+                response = self._get(url, headers=headers, timeout=10)
                 
                 if response.status_code == 200:
                     return response.json()
@@ -264,7 +357,7 @@ class CapitalAPI:
                         time.sleep(retry_delay)
                         continue
                     else:
-                        print(f"[WARNING] Could not fetch details for {epic} after {max_retries} attempts")
+                        self.log(f"[WARNING] Could not fetch details for {epic} after {max_retries} attempts")
                         return None
                 else:
                     return None
@@ -281,6 +374,61 @@ class CapitalAPI:
         
         return None
     
+    def get_market_details_batch(self, epics: List[str]) -> Dict[str, Dict]:
+        """
+        Get details for many markets with one request per MAX_EPICS_PER_REQUEST epics
+        
+        Args:
+            epics: Market epic codes
+        
+        Returns:
+            Epic -> details, in the same shape as get_market_details(); epics
+            the API did not return (or whose batch failed) are left out
+        """
+        if not epics or not self.ensure_session():
+            return {}
+        
+        url = f"{self.base_url}/markets"
+        headers = self._get_auth_headers()
+        details_by_epic = {}
+        
+        max_retries = 3
+        retry_delay = 2
+        
+        for start in range(0, len(epics), self.MAX_EPICS_PER_REQUEST):
+            batch = epics[start:start + self.MAX_EPICS_PER_REQUEST]
+            
+            for attempt in range(1, max_retries + 1):
+                try:
+                    response = self._get(url, headers=headers, params={"epics": ",".join(batch)}, timeout=10)
+                    
+                    if response.status_code == 200:
+                        for details in response.json().get('marketDetails', []):
+                            epic = details.get('instrument', {}).get('epic')
+                            if epic:
+                                details_by_epic[epic] = details
+                        break
+                    
+                    elif response.status_code >= 500 and attempt < max_retries:
+                        time.sleep(retry_delay)
+                        continue
+                    else:
+                        self.log(f"[WARNING] Could not fetch details for {len(batch)} markets (HTTP {response.status_code})")
+                        break
+                
+                except requests.exceptions.Timeout:
+                    if attempt < max_retries:
+                        time.sleep(retry_delay)
+                        continue
+                    self.log(f"[WARNING] Timeout fetching details for {len(batch)} markets")
+                    break
+                
+                except Exception as e:
+                    self.log(f"[WARNING] Error fetching details for {len(batch)} markets: {str(e)}")
+                    break
+        
+        return details_by_epic
+    
     def get_historical_prices(self, epic: str, resolution: str = "DAY", 
                             from_date: Optional[str] = None, 
                             to_date: Optional[str] = None,
@@ -314,7 +462,7 @@ class CapitalAPI:
             params["to"] = to_date
         
         try:
-            response = self.session.get(url, headers=headers, params=params)
+            response = self._get(url, headers=headers, params=params)
             if response.status_code == 200:
                 return response.json()
             return None
@@ -334,10 +482,15 @@ class CapitalAPI:
         
         return all_markets
     
-    def calculate_performance(self, epic: str) -> Dict[str, Optional[float]]:
+    def calculate_performance(self, epic: str, details: Optional[Dict] = None) -> Dict[str, Optional[float]]:
         """
         Calculate performance metrics for a market (both intraday and historical)
         
+        Args:
+            epic: Market epic code
+            details: Market details already fetched by the caller; fetched
+                     here when not provided
+        
         Returns:
             Dictionary with performance percentages for various time periods
         """
@@ -356,7 +509,8 @@ class CapitalAPI:
         }
         
         # Get current market snapshot first
-        details = self.get_market_details(epic)
+        if details is None:
+            details = self.get_market_details(epic)
         if details and 'snapshot' in details:
             snapshot = details['snapshot']
             performance['price_change_pct'] = snapshot.get('percentageChange')
@@ -17,6 +17,8 @@ USE_DEMO = True
 
 # Export Settings
 OUTPUT_FILENAME = "capital_markets_analysis.csv"
+CSV_COMPRESSION = None  # Set to "gzip" to compress the CSV on the fly (written as OUTPUT_FILENAME + ".gz")
+PARQUET_FILENAME = "capital_markets_analysis.parquet"  # Typed sidecar (needs pyarrow), None to disable
 
 # Categories to fetch (comment out any you don't want)
 CATEGORIES = [
@@ -27,8 +29,23 @@ CATEGORIES = [
     'shares',  # Includes ETFs
 ]
 
-# Rate limiting (seconds to wait between API calls)
-REQUEST_DELAY = 0.15
+# Rate limiting (sustained API requests per second, shared by all threads)
+MAX_REQUESTS_PER_SECOND = 10
+
+# Number of markets fetched concurrently within a category
+MAX_WORKERS = 8
+
+# Seconds between keep-alive pings during a long fetch
+PING_INTERVAL = 20
+
+# Markets fetched between progress lines
+PROGRESS_EVERY = 25
+
+# Response cache (seconds an entry stays fresh)
+CACHE_DIR = ".cache"
+SNAPSHOT_TTL = 60          # Market details / snapshot prices
+PERF_TTL = 86400           # Historical performance windows
+SESSION_TTL = 28800        # Saved login tokens, reused across runs
 
 # Maximum markets to fetch per category (set to None for all)
 MAX_MARKETS_PER_CATEGORY = None  # Fetch all markets
@@ -103,6 +103,45 @@ def save_market_data(data):
     conn.commit()
     conn.close()
 
+# Low-cardinality text columns, loaded as pandas categoricals
+CATEGORICAL_COLUMNS = ('category', 'currency', 'market_status', 'type')
+
+def get_column_dtypes(conn, table, categorical=()):
+    """
+    Map a table's columns to pandas dtypes from its declared schema
+    
+    REAL columns become float64, so a column that is entirely NULL still
+    comes back numeric instead of object. Columns named in categorical
+    become 'category', which stores each repeated string once.
+    """
+    dtypes = {}
+    for row in conn.execute(f"PRAGMA table_info({table})").fetchall():
+        if row['type'].upper() == 'REAL':
+            dtypes[row['name']] = 'float64'
+        elif row['name'] in categorical:
+            dtypes[row['name']] = 'category'
+    return dtypes
+
+# The DB columns are snake_case, the app expects Title Case with spaces
+DF_COLUMN_NAMES = {
+    'category': 'Category',
+    'symbol': 'Symbol',
+    'name': 'Name',
+    'current_price': 'Current Price',
+    'currency': 'Currency',
+    'price_change_pct': 'Price Change %',
+    'perf_1w_pct': 'Perf % 1W',
+    'perf_1m_pct': 'Perf % 1M',
+    'perf_3m_pct': 'Perf % 3M',
+    'perf_6m_pct': 'Perf % 6M',
+    'perf_ytd_pct': 'Perf % YTD',
+    'perf_1y_pct': 'Perf % 1Y',
+    'perf_5y_pct': 'Perf % 5Y',
+    'perf_10y_pct': 'Perf % 10Y',
+    'market_status': 'Market Status',
+    'type': 'Type'
+}
+
 def load_market_data_df():
     """Load market data into a pandas DataFrame"""
     if not os.path.exists(DB_FILE):
@@ -110,29 +149,10 @@ def load_market_data_df():
         
     conn = get_db_connection()
     try:
-        df = pd.read_sql_query("SELECT * FROM markets", conn)
+        df = pd.read_sql_query("SELECT * FROM markets", conn,
+                               dtype=get_column_dtypes(conn, 'markets', CATEGORICAL_COLUMNS))
         
-        # Rename columns to match the expected format in the app
-        # The DB columns are snake_case, app expects Title Case with spaces
-        column_mapping = {
-            'category': 'Category',
-            'symbol': 'Symbol',
-            'name': 'Name',
-            'current_price': 'Current Price',
-            'currency': 'Currency',
-            'price_change_pct': 'Price Change %',
-            'perf_1w_pct': 'Perf % 1W',
-            'perf_1m_pct': 'Perf % 1M',
-            'perf_3m_pct': 'Perf % 3M',
-            'perf_6m_pct': 'Perf % 6M',
-            'perf_ytd_pct': 'Perf % YTD',
-            'perf_1y_pct': 'Perf % 1Y',
-            'perf_5y_pct': 'Perf % 5Y',
-            'perf_10y_pct': 'Perf % 10Y',
-            'market_status': 'Market Status',
-            'type': 'Type'
-        }
-        df = df.rename(columns=column_mapping)
+        df = df.rename(columns=DF_COLUMN_NAMES)
         return df
     except Exception as e:
         print(f"Error loading data from DB: {e}")
@@ -140,48 +160,70 @@ def load_market_data_df():
     finally:
         conn.close()
 
-def load_market_data_list():
-    """Load market data as a list of dictionaries"""
+# API field names and the markets columns they are read from
+MARKET_FIELDS = {
+    'Category': 'category',
+    'Symbol': 'symbol',
+    'Name': 'name',
+    'Current Price': 'current_price',
+    'Currency': 'currency',
+    'Price Change %': 'price_change_pct',
+    'Perf % 1W': 'perf_1w_pct',
+    'Perf % 1M': 'perf_1m_pct',
+    'Perf % 3M': 'perf_3m_pct',
+    'Perf % 6M': 'perf_6m_pct',
+    'Perf % YTD': 'perf_ytd_pct',
+    'Perf % 1Y': 'perf_1y_pct',
+    'Perf % 5Y': 'perf_5y_pct',
+    'Perf % 10Y': 'perf_10y_pct'
+}
+
+def load_market_data_list(fields=None, limit=None, offset=0):
+    """
+    Load market data as a list of dictionaries
+    
+    Args:
+        fields: MARKET_FIELDS keys to return (default: all of them)
+        limit: Maximum number of rows (default: no limit)
+        offset: Number of rows to skip
+    """
     if not os.path.exists(DB_FILE):
         return []
-        
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     
+    fields = list(fields or MARKET_FIELDS)
+    # Field names are whitelisted through MARKET_FIELDS, so they are safe to inline
+    columns = ', '.join(f'{MARKET_FIELDS[field]} AS "{field}"' for field in fields)
+    
+    conn = get_db_connection()
     try:
-        cursor.execute("SELECT * FROM markets")
-        rows = cursor.fetchall()
-        
-        result = []
-        for row in rows:
-            item = dict(row)
-            # Map keys to match expected format
-            mapped_item = {
-                'Category': item['category'],
-                'Symbol': item['symbol'],
-                'Name': item['name'],
-                'Current Price': item['current_price'],
-                'Currency': item['currency'],
-                'Price Change %': item['price_change_pct'],
-                'Perf % 1W': item['perf_1w_pct'],
-                'Perf % 1M': item['perf_1m_pct'],
-                'Perf % 3M': item['perf_3m_pct'],
-                'Perf % 6M': item['perf_6m_pct'],
-                'Perf % YTD': item['perf_ytd_pct'],
-                'Perf % 1Y': item['perf_1y_pct'],
-                'Perf % 5Y': item['perf_5y_pct'],
-                'Perf % 10Y': item['perf_10y_pct']
-            }
-            result.append(mapped_item)
-            
-        return result
+        rows = conn.execute(
+            f"SELECT {columns} FROM markets ORDER BY id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
     except Exception as e:
         print(f"Error loading data from DB: {e}")
         return []
     finally:
         conn.close()
 
+def get_categories():
+    """Get the sorted distinct market categories, without loading the table"""
+    if not os.path.exists(DB_FILE):
+        return []
+        
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT COALESCE(category, 'Unknown') FROM markets ORDER BY 1"
+        ).fetchall()
+        return [row[0] for row in rows]
+    except Exception as e:
+        print(f"Error loading categories from DB: {e}")
+        return []
+    finally:
+        conn.close()
+
 def get_last_updated():
     """Get the timestamp of the last update formatted nicely"""
     if not os.path.exists(DB_FILE):
@@ -0,0 +1,23 @@
+"""
+Ranking helpers shared by the dashboard and the terminal viewer
+"""
+
+import numpy as np
+
+
+def top_k_positions(values, k):
+    """
+    Row positions of the k largest non-NaN values, largest first
+    
+    Uses np.partition to find the cut-off in O(N) rather than sorting
+    everything; only the k selected rows are sorted. Ties keep row order,
+    matching DataFrame.nlargest. Pass -values for the k smallest.
+    """
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) > k:
+        v = values[valid]
+        threshold = np.partition(v, len(v) - k)[len(v) - k]
+        above = valid[v > threshold]
+        ties = valid[v == threshold][:k - len(above)]
+        valid = np.concatenate([above, ties])
+    return valid[np.lexsort((valid, -values[valid]))]
@@ -3,11 +3,16 @@ Main script to fetch and analyze Capital.com markets
 Stores data directly to SQLite database (primary storage)
 """
 
-import csv
+import gzip
 import sqlite3
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Optional
+import pandas as pd
 from capital_analyzer import CapitalAPI
+from cache import FileCache
 import os
 import sys
 
@@ -20,14 +25,51 @@ except ImportError:
     sys.exit(1)
 
 
-def format_percentage(value: float) -> str:
-    """Format percentage value for display"""
-    if value is None:
-        return "N/A"
-    return f"{value:.2f}%"
+# CSV column order
+FIELDNAMES = [
+    'Category',
+    'Symbol',
+    'Name',
+    'Current Price',
+    'Currency',
+    'Price Change %',
+    'Perf % 30M',
+    'Perf % 1H',
+    'Perf % 4H',
+    'Perf % 6H',
+    'Perf % 1D',
+    'Perf % 1W',
+    'Perf % 1M',
+    'Perf % 3M',
+    'Perf % 6M',
+    'Perf % YTD',
+    'Perf % 1Y',
+    'Perf % 5Y',
+    'Perf % 10Y',
+    'Market Status',
+    'Type',
+]
 
+# Columns holding raw percentage floats, formatted only at export time
+PERCENT_COLUMNS = [name for name in FIELDNAMES if '%' in name]
 
-def init_database(db_path: str = 'market_data.db'):
+# Bytes buffered in memory before each write to the CSV file
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# Rows formatted and written per batch, so only one batch of strings is held at a time
+CSV_CHUNK_ROWS = 100000
+
+
+def format_percentages(df: pd.DataFrame) -> pd.DataFrame:
+    """Format percentage columns for display ("1.23%", or "N/A" when missing)"""
+    formatted = df.copy()
+    for col in PERCENT_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce')
+        formatted[col] = values.map('{:.2f}%'.format, na_action='ignore').fillna('N/A')
+    return formatted
+
+
+def init_database(db_path: str = 'market_data.db', log: Callable[..., None] = print):
     """Initialize SQLite database with markets table"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -65,11 +107,19 @@ def init_database(db_path: str = 'market_data.db'):
     
     conn.commit()
     conn.close()
-    print(f"[OK] Database initialized at {db_path}")
+    log(f"[OK] Database initialized at {db_path}")
 
 
-def store_to_database(market_data: list, db_path: str = 'market_data.db'):
-    """Store market data directly to SQLite database"""
+def store_to_database(market_data: dict, db_path: str = 'market_data.db',
+                      log: Callable[..., None] = print):
+    """
+    Store market data directly to SQLite database
+    
+    Args:
+        market_data: Column name -> list of values, as returned by
+                     fetch_and_analyze_markets
+        log: Called like print() with status messages
+    """
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
@@ -88,33 +138,28 @@ def store_to_database(market_data: list, db_path: str = 'market_data.db'):
                     return None
             return float(val)
         
-        # Insert market data
-        for row in market_data:
-            cursor.execute('''
-                INSERT INTO markets (
-                    category, symbol, name, current_price, currency,
-                    price_change_pct, perf_1w_pct, perf_1m_pct, perf_3m_pct,
-                    perf_6m_pct, perf_ytd_pct, perf_1y_pct, perf_5y_pct,
-                    perf_10y_pct, market_status, type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row.get('Category', ''),
-                row.get('Symbol', ''),
-                row.get('Name', ''),
-                parse_pct(row.get('Current Price')),
-                row.get('Currency', ''),
-                parse_pct(row.get('Price Change %')),
-                parse_pct(row.get('Perf % 1W')),
-                parse_pct(row.get('Perf % 1M')),
-                parse_pct(row.get('Perf % 3M')),
-                parse_pct(row.get('Perf % 6M')),
-                parse_pct(row.get('Perf % YTD')),
-                parse_pct(row.get('Perf % 1Y')),
-                parse_pct(row.get('Perf % 5Y')),
-                parse_pct(row.get('Perf % 10Y')),
-                row.get('Market Status', ''),
-                row.get('Type', '')
-            ))
+        # Insert market data, zipping the columns back into rows
+        rows = zip(
+            market_data['Category'],
+            market_data['Symbol'],
+            market_data['Name'],
+            map(parse_pct, market_data['Current Price']),
+            market_data['Currency'],
+            *(map(parse_pct, market_data[name]) for name in (
+                'Price Change %', 'Perf % 1W', 'Perf % 1M', 'Perf % 3M',
+                'Perf % 6M', 'Perf % YTD', 'Perf % 1Y', 'Perf % 5Y', 'Perf % 10Y',
+            )),
+            market_data['Market Status'],
+            market_data['Type'],
+        )
+        cursor.executemany('''
+            INSERT INTO markets (
+                category, symbol, name, current_price, currency,
+                price_change_pct, perf_1w_pct, perf_1m_pct, perf_3m_pct,
+                perf_6m_pct, perf_ytd_pct, perf_1y_pct, perf_5y_pct,
+                perf_10y_pct, market_status, type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
         
         # Update metadata with last fetch time
         cursor.execute('DELETE FROM metadata WHERE key = ?', ('last_fetch_time',))
@@ -124,21 +169,128 @@ def store_to_database(market_data: list, db_path: str = 'market_data.db'):
         )
         
         conn.commit()
-        print(f"[OK] Stored {len(market_data)} markets to database")
+        log(f"[OK] Stored {len(market_data['Symbol'])} markets to database")
         
     except Exception as e:
-        print(f"[ERROR] Error storing to database: {e}")
+        log(f"[ERROR] Error storing to database: {e}")
         conn.rollback()
     finally:
         conn.close()
 
 
-def fetch_and_analyze_markets(api: CapitalAPI, categories: list) -> list:
+def count_windows(performance: dict) -> int:
+    """Count the performance windows that have a value"""
+    return sum(value is not None for value in performance.values())
+
+
+def open_session(api: CapitalAPI, cache: FileCache, log: Callable[..., None] = print) -> bool:
+    """
+    Reuse the session tokens saved by a previous run, logging in only when
+    they are missing, older than SESSION_TTL or rejected by a ping
+    
+    Tokens are keyed on the account and environment so demo tokens are
+    never sent to the live API.
+    """
+    key = {'identifier': config.USERNAME, 'demo': config.USE_DEMO}
+    saved = cache.get('_session', 'session', key, ttl=getattr(config, 'SESSION_TTL', 8 * 3600))
+    if saved and api.restore_session(saved['cst'], saved['security_token']):
+        log("[OK] Reusing saved session")
+        return True
+    
+    if not api.create_session():
+        return False
+    cache.set('_session', 'session', {'cst': api.cst, 'security_token': api.security_token}, key)
+    return True
+
+
+def enable_response_cache(api: CapitalAPI, cache: FileCache):
+    """
+    Route market details and performance lookups through a file cache
+    
+    Details carry the live snapshot (bid, percentageChange, marketStatus)
+    and get a short TTL; performance windows change slowly and get a long
+    one. An expired performance entry is only replaced by a payload with
+    at least as many windows, so a partial historical-price outage does
+    not overwrite good data.
+    """
+    snapshot_ttl = getattr(config, 'SNAPSHOT_TTL', 60)
+    api.get_market_details = cache.cached('snapshot', ttl=snapshot_ttl)(api.get_market_details)
+    api.get_market_details_batch = cache.cached_batch(
+        'snapshot', ttl=snapshot_ttl
+    )(api.get_market_details_batch)
+    api.calculate_performance = cache.cached(
+        'performance', ttl=getattr(config, 'PERF_TTL', 86400),
+        cache_if=count_windows,
+        replace_if=lambda stale, fresh: count_windows(fresh) >= count_windows(stale)
+    )(api.calculate_performance)
+
+
+def fetch_market(api: CapitalAPI, category: str, market: dict,
+                 details: Optional[dict] = None) -> Optional[dict]:
+    """
+    Fetch details and performance metrics for a single market
+
+    Args:
+        details: Market details already fetched in a batch; fetched
+                 individually when missing
+
+    Returns:
+        Dictionary with market data, or None if details could not be fetched
+    """
+    epic = market.get('epic')
+    name = market.get('instrumentName', epic)
+
+    # Get market details
+    if details is None:
+        details = api.get_market_details(epic)
+    if not details:
+        return None
+
+    snapshot = details.get('snapshot', {})
+    instrument = details.get('instrument', {})
+
+    # Calculate performance metrics, reusing the details fetched above
+    performance = api.calculate_performance(epic, details)
+
+    # Compile data
+    return {
+        'Category': category.title(),
+        'Symbol': epic,
+        'Name': name,
+        'Current Price': snapshot.get('bid', 'N/A'),
+        'Currency': instrument.get('currency', 'N/A'),
+        'Price Change %': snapshot.get('percentageChange'),
+        'Perf % 30M': performance.get('perf_30m'),
+        'Perf % 1H': performance.get('perf_1h'),
+        'Perf % 4H': performance.get('perf_4h'),
+        'Perf % 6H': performance.get('perf_6h'),
+        'Perf % 1D': performance.get('perf_1d'),
+        'Perf % 1W': performance.get('perf_1w'),
+        'Perf % 1M': performance.get('perf_1m'),
+        'Perf % 3M': performance.get('perf_3m'),
+        'Perf % 6M': performance.get('perf_6m'),
+        'Perf % YTD': performance.get('perf_ytd'),
+        'Perf % 1Y': performance.get('perf_1y'),
+        'Perf % 5Y': performance.get('perf_5y'),
+        'Perf % 10Y': performance.get('perf_10y'),
+        'Market Status': snapshot.get('marketStatus', 'N/A'),
+        'Type': instrument.get('type', category.upper()),
+    }
+
+
+def fetch_and_analyze_markets(api: CapitalAPI, categories: list,
+                              log: Callable[..., None] = print) -> Dict[str, list]:
     """
     Fetch all markets and calculate performance metrics
     
+    All category listings are requested up front, and markets within a
+    category are fetched concurrently, by one pool of MAX_WORKERS threads;
+    CapitalAPI's token bucket enforces the shared request-rate ceiling.
+    Each category's market details come from batched /markets?epics=
+    requests, with single-market lookups only for epics the batch missed.
+    
     Returns:
-        List of dictionaries with market data and performance metrics
+        Column name (see FIELDNAMES) -> list of values, one per market
     """
     # Category-specific limits
     CATEGORY_LIMITS = {
@@ -150,185 +302,220 @@ def fetch_and_analyze_markets(api: CapitalAPI, categories: list) -> list:
         'cryptocurrencies': 20,
     }
     
-    all_data = []
+    columns = {name: [] for name in FIELDNAMES}
     total_markets = 0
     
-    for category in categories:
-        print(f"\n{'='*60}")
-        print(f"Processing category: {category.upper()}")
-        print(f"{'='*60}")
-        
-        # Fetch markets in this category
-        markets = api.get_markets_by_category(category)
-        
-        # Apply category-specific limit
-        category_lower = category.lower()
-        limit = CATEGORY_LIMITS.get(category_lower)
-        if limit is not None:
-            markets = markets[:limit]
-            print(f"  Limiting to top {limit} {category} entries")
+    max_workers = getattr(config, 'MAX_WORKERS', 8)
+    ping_interval = getattr(config, 'PING_INTERVAL', 20)
+    progress_every = getattr(config, 'PROGRESS_EVERY', 25)
+    last_ping = time.monotonic()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Request every category listing up front; results still arrive in category order
+        listings = pool.map(api.get_markets_by_category, categories)
         
-        for idx, market in enumerate(markets, 1):
-            epic = market.get('epic')
-            name = market.get('instrumentName', epic)
-            
-            print(f"  [{idx}/{len(markets)}] Processing {name} ({epic})...")
+        for category, markets in zip(categories, listings):
+            log(f"\n{'='*60}")
+            log(f"Processing category: {category.upper()}")
+            log(f"{'='*60}")
             
-            # Get market details
-            details = api.get_market_details(epic)
+            # Apply category-specific limit
+            category_lower = category.lower()
+            limit = CATEGORY_LIMITS.get(category_lower)
+            if limit is not None:
+                markets = markets[:limit]
+                log(f"  Limiting to top {limit} {category} entries")
             
-            if not details:
-                print(f"    [WARNING] Could not fetch details for {epic}")
-                continue
+            # Markets without an epic can't be looked up (or cached); skip them up front
+            without_epic = sum(1 for m in markets if not m.get('epic'))
+            if without_epic:
+                log(f"  [WARNING] Skipping {without_epic} markets without an epic")
+                markets = [m for m in markets if m.get('epic')]
             
-            snapshot = details.get('snapshot', {})
-            instrument = details.get('instrument', {})
+            # One request per batch of epics instead of one details call per market
+            details_by_epic = api.get_market_details_batch([m['epic'] for m in markets])
+            details = [details_by_epic.get(m['epic']) for m in markets]
             
-            # Calculate performance metrics
-            performance = api.calculate_performance(epic)
+            # map() keeps results in market order
+            fetch = partial(fetch_market, api, category)
+            failed = []
+            for idx, (market, market_data) in enumerate(zip(markets, pool.map(fetch, markets, details)), 1):
+                if not market_data:
+                    failed.append(market.get('epic'))
+                else:
+                    for name in FIELDNAMES:
+                        columns[name].append(market_data[name])
+                    total_markets += 1
+                
+                # One progress line per batch instead of one per market
+                if idx % progress_every == 0 or idx == len(markets):
+                    log(f"  [{idx}/{len(markets)}] Processed")
+                
+                # Ping session periodically to keep it alive
+                if time.monotonic() - last_ping >= ping_interval:
+                    api.ping()
+                    last_ping = time.monotonic()
             
-            # Compile data
-            market_data = {
-                'Category': category.title(),
-                'Symbol': epic,
-                'Name': name,
-                'Current Price': snapshot.get('bid', 'N/A'),
-                'Currency': instrument.get('currency', 'N/A'),
-                'Price Change %': format_percentage(snapshot.get('percentageChange')),
-                'Perf % 30M': format_percentage(performance.get('perf_30m')),
-                'Perf % 1H': format_percentage(performance.get('perf_1h')),
-                'Perf % 4H': format_percentage(performance.get('perf_4h')),
-                'Perf % 6H': format_percentage(performance.get('perf_6h')),
-                'Perf % 1D': format_percentage(performance.get('perf_1d')),
-                'Perf % 1W': format_percentage(performance.get('perf_1w')),
-                'Perf % 1M': format_percentage(performance.get('perf_1m')),
-                'Perf % 3M': format_percentage(performance.get('perf_3m')),
-                'Perf % 6M': format_percentage(performance.get('perf_6m')),
-                'Perf % YTD': format_percentage(performance.get('perf_ytd')),
-                'Perf % 1Y': format_percentage(performance.get('perf_1y')),
-                'Perf % 5Y': format_percentage(performance.get('perf_5y')),
-                'Perf % 10Y': format_percentage(performance.get('perf_10y')),
-                'Market Status': snapshot.get('marketStatus', 'N/A'),
-                'Type': instrument.get('type', category.upper()),
-            }
-            
-            all_data.append(market_data)
-            total_markets += 1
-            
-            # Rate limiting
-            time.sleep(getattr(config, 'REQUEST_DELAY', 0.15))
-            
-            # Ping session every 20 requests to keep it alive
-            if idx % 20 == 0:
-                api.ping()
+            if failed:
+                log(f"  [WARNING] Could not fetch details for {len(failed)} markets: {', '.join(failed)}")
     
-    print(f"\n{'='*60}")
-    print(f"[OK] Completed! Processed {total_markets} markets across {len(categories)} categories")
-    print(f"{'='*60}\n")
+    log(f"\n{'='*60}")
+    log(f"[OK] Completed! Processed {total_markets} markets across {len(categories)} categories")
+    log(f"{'='*60}\n")
     
-    return all_data
+    return columns
 
 
-def export_to_csv(data: list, filename: str):
-    """Export market data to CSV file"""
-    if not data:
-        print("[ERROR] No data to export")
-        return
+def csv_export_path(filename: str) -> str:
+    """Path the CSV export is written to: filename, plus '.gz' when CSV_COMPRESSION is 'gzip'"""
+    if getattr(config, 'CSV_COMPRESSION', None) == 'gzip' and not filename.endswith('.gz'):
+        return filename + '.gz'
+    return filename
+
+
+def export_to_csv(data: dict, filename: str, log: Callable[..., None] = print):
+    """
+    Export market data (column name -> values) to CSV file
     
-    # Define column order
-    fieldnames = [
-        'Category',
-        'Symbol',
-        'Name',
-        'Current Price',
-        'Currency',
-        'Price Change %',
-        'Perf % 30M',
-        'Perf % 1H',
-        'Perf % 4H',
-        'Perf % 6H',
-        'Perf % 1D',
-        'Perf % 1W',
-        'Perf % 1M',
-        'Perf % 3M',
-        'Perf % 6M',
-        'Perf % YTD',
-        'Perf % 1Y',
-        'Perf % 5Y',
-        'Perf % 10Y',
-        'Market Status',
-        'Type',
-    ]
+    With CSV_COMPRESSION = "gzip" the file is written as filename + '.gz'
+    (see csv_export_path), so the extension always matches the contents.
+    """
+    if not data or not data['Symbol']:
+        log("[ERROR] No data to export")
+        return
     
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+        raw_df = pd.DataFrame(data, columns=FIELDNAMES)
+        
+        compression = getattr(config, 'CSV_COMPRESSION', None)
+        if compression and compression != 'gzip':
+            raise ValueError(f"Unsupported CSV_COMPRESSION: {compression}")
+        filename = csv_export_path(filename)
+        
+        # Write next to the target and swap it in, so readers never see a partial file
+        tmp_filename = filename + '.tmp'
+        if compression == 'gzip':
+            # Compressed on the fly as each chunk is written
+            csvfile = gzip.open(tmp_filename, 'wt', newline='', encoding='utf-8')
+        else:
+            csvfile = open(tmp_filename, 'w', newline='', encoding='utf-8', buffering=CSV_BUFFER_SIZE)
+        
+        try:
+            with csvfile:
+                for start in range(0, len(raw_df), CSV_CHUNK_ROWS):
+                    chunk = format_percentages(raw_df.iloc[start:start + CSV_CHUNK_ROWS])
+                    chunk.to_csv(csvfile, index=False, header=(start == 0))
+            os.replace(tmp_filename, filename)
+        except Exception:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        
+        # Drop the other variant left by a run with a different CSV_COMPRESSION
+        stale = filename[:-len('.gz')] if compression == 'gzip' else filename + '.gz'
+        if os.path.exists(stale):
+            os.remove(stale)
         
-        print(f"[OK] Data exported to: {filename}")
-        print(f"  Total rows: {len(data)}")
+        log(f"[OK] Data exported to: {filename}")
+        log(f"  Total rows: {len(raw_df)}")
     except Exception as e:
-        print(f"[ERROR] Error exporting to CSV: {str(e)}")
-
-
-def main():
-    """Main execution function"""
-    print("="*60)
-    print("Capital.com Market Analyzer")
-    print("="*60)
-    print(f"Environment: {'DEMO' if config.USE_DEMO else 'LIVE'}")
-    print(f"Categories: {', '.join(config.CATEGORIES)}")
-    print(f"Database: market_data.db (primary storage)")
-    print("="*60)
+        log(f"[ERROR] Error exporting to CSV: {str(e)}")
+        return
+    
+    parquet_filename = getattr(config, 'PARQUET_FILENAME', None)
+    if parquet_filename:
+        export_to_parquet(raw_df, parquet_filename, log)
+
+
+def export_to_parquet(df: pd.DataFrame, filename: str, log: Callable[..., None] = print):
+    """Write the unformatted (numeric) export as a Parquet sidecar to the CSV"""
+    try:
+        # Missing prices come through as 'N/A'; Parquet needs one type per column
+        df = df.assign(**{'Current Price': pd.to_numeric(df['Current Price'], errors='coerce')})
+        df.to_parquet(filename, compression='zstd', index=False)
+        log(f"[OK] Parquet sidecar written to: {filename}")
+    except ImportError:
+        log("[WARNING] pyarrow not installed, skipping Parquet sidecar")
+    except Exception as e:
+        log(f"[WARNING] Error writing Parquet sidecar: {str(e)}")
+
+
+def main(log: Callable[..., None] = print) -> bool:
+    """
+    Main execution function
+    
+    Args:
+        log: Called like print() with each progress line, so callers such
+             as the dashboard can capture the output without touching stdout
+    
+    Returns:
+        True if the fetch ran to completion, False otherwise
+    """
+    log("="*60)
+    log("Capital.com Market Analyzer")
+    log("="*60)
+    log(f"Environment: {'DEMO' if config.USE_DEMO else 'LIVE'}")
+    log(f"Categories: {', '.join(config.CATEGORIES)}")
+    log(f"Database: market_data.db (primary storage)")
+    log("="*60)
     
     # Initialize database
-    print("\nInitializing SQLite database...")
-    init_database('market_data.db')
+    log("\nInitializing SQLite database...")
+    init_database('market_data.db', log)
     
     # Initialize API client
-    print("Initializing API client...")
+    log("Initializing API client...")
     api = CapitalAPI(
         api_key=config.API_KEY,
         identifier=config.USERNAME,
         password=config.PASSWORD,
-        demo=config.USE_DEMO
+        demo=config.USE_DEMO,
+        pool_size=getattr(config, 'MAX_WORKERS', 8),
+        max_requests_per_second=getattr(config, 'MAX_REQUESTS_PER_SECOND', 10),
+        log=log
     )
     
-    # Create session
-    if not api.create_session():
-        print("[ERROR] Failed to create session. Please check your credentials.")
-        return
+    cache = FileCache(getattr(config, 'CACHE_DIR', '.cache'))
+    
+    # Create session (or reuse the one from the last run)
+    if not open_session(api, cache, log):
+        log("[ERROR] Failed to create session. Please check your credentials.")
+        return False
+    
+    # Serve repeat lookups from the on-disk cache
+    enable_response_cache(api, cache)
     
     # Fetch and analyze markets
     start_time = datetime.now()
-    market_data = fetch_and_analyze_markets(api, config.CATEGORIES)
+    market_data = fetch_and_analyze_markets(api, config.CATEGORIES, log)
     end_time = datetime.now()
+    total_markets = len(market_data['Symbol'])
     
     # Store to database (primary storage)
-    if market_data:
-        print("\nStoring data to database...")
-        store_to_database(market_data, 'market_data.db')
+    if total_markets:
+        log("\nStoring data to database...")
+        store_to_database(market_data, 'market_data.db', log)
     
     # Also export to CSV for backup
-    if market_data:
-        print("Exporting data to CSV (backup)...")
-        export_to_csv(market_data, config.OUTPUT_FILENAME)
+    if total_markets:
+        log("Exporting data to CSV (backup)...")
+        export_to_csv(market_data, config.OUTPUT_FILENAME, log)
     
     # Print summary
     duration = (end_time - start_time).total_seconds()
-    print(f"\n{'='*60}")
-    print(f"Execution Summary")
-    print(f"{'='*60}")
-    print(f"Total time: {duration:.2f} seconds")
-    print(f"Markets processed: {len(market_data)}")
-    print(f"Categories: {len(config.CATEGORIES)}")
-    print(f"Primary database: market_data.db")
-    print(f"Backup CSV: {config.OUTPUT_FILENAME}")
-    print(f"{'='*60}\n")
+    log(f"\n{'='*60}")
+    log(f"Execution Summary")
+    log(f"{'='*60}")
+    log(f"Total time: {duration:.2f} seconds")
+    log(f"Markets processed: {total_markets}")
+    log(f"Categories: {len(config.CATEGORIES)}")
+    log(f"Primary database: market_data.db")
+    log(f"Backup CSV: {csv_export_path(config.OUTPUT_FILENAME)}")
+    log(f"{'='*60}\n")
     
-    print("[OK] Analysis complete! Data saved to database and CSV file.")
-    print("You can now view the data using the web viewer (app.py) or open the CSV file.")
+    log("[OK] Analysis complete! Data saved to database and CSV file.")
+    log("You can now view the data using the web viewer (app.py) or open the CSV file.")
+    return True
 
 
 if __name__ == "__main__":
@@ -9,12 +9,19 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-import subprocess
-import sys
+import contextlib
+import importlib.util
+import io
+import threading
 import database  # Import database module
+import run_analyzer as analyzer
+from ranking import top_k_positions
 from capital_analyzer import CapitalAPI
 import config
 
+# Arrow-backed strings need pyarrow, which stays optional
+ARROW_STRINGS = importlib.util.find_spec('pyarrow') is not None
+
 st.set_page_config(
     page_title="Capital.com Market Analyzer",
     page_icon="📊",
@@ -114,10 +121,14 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def should_fetch_fresh_data():
-    """Check if we should fetch fresh data based on last fetch date"""
+def should_fetch_fresh_data(last_updated):
+    """
+    Check if we should fetch fresh data based on last fetch date
+    
+    Args:
+        last_updated: Last fetch timestamp from database.get_last_updated()
+    """
     try:
-        last_updated = database.get_last_updated()
         st.write(f"[DEBUG] last_updated from DB: {last_updated}")
         if not last_updated:
             st.write("[DEBUG] No last_updated found, will fetch fresh data")
@@ -142,47 +153,72 @@ def should_fetch_fresh_data():
         st.error(traceback.format_exc())
         return True  # Default to fetching if we can't determine
 
+class StreamToContainer(io.TextIOBase):
+    """File-like object that mirrors logged lines into a Streamlit container"""
+    
+    def __init__(self, container):
+        self.container = container
+        self.lines = []
+        self._partial = ''
+        self._lock = threading.Lock()
+        # Only the script thread may touch Streamlit elements; analyzer
+        # worker threads just buffer their lines
+        self._owner = threading.get_ident()
+    
+    def write(self, text):
+        with self._lock:
+            self._partial += text
+            *complete, self._partial = self._partial.split('\n')
+            self.lines.extend(complete)
+        if complete and threading.get_ident() == self._owner:
+            self.container.code('\n'.join(self.lines), language='text')
+        return len(text)
+    
+    def print(self, *values, sep=' ', end='\n'):
+        """print() replacement for analyzer.main(log=...); each call is written in one piece"""
+        self.write(sep.join(map(str, values)) + end)
+    
+    def getvalue(self):
+        """Return everything written so far"""
+        with self._lock:
+            return '\n'.join(self.lines + [self._partial])
+
+@st.cache_resource
+def refresh_lock():
+    """Process-wide lock so only one session runs the analyzer at a time"""
+    return threading.Lock()
+
 def run_analyzer():
-    """Run run_analyzer.py to fetch fresh market data with live progress streaming"""
+    """Run the analyzer in-process to fetch fresh market data with live progress streaming"""
+    lock = refresh_lock()
+    if not lock.acquire(blocking=False):
+        # Another session is already fetching; share its result instead of fetching again
+        with st.spinner("Another session is fetching market data; waiting for it to finish..."):
+            with lock:
+                pass
+        return
+    
     try:
         st.info("🔄 Fetching fresh market data from Capital.com...")
         
-        # Get the directory where this script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        analyzer_script = os.path.join(script_dir, 'run_analyzer.py')
-        
         # Create a container for live output
         output_container = st.empty()
-        output_text = []
-        
-        # Use Popen to stream output in real-time (no timeout)
-        process = subprocess.Popen(
-            [sys.executable, analyzer_script],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
-        )
+        output = StreamToContainer(output_container)
         
-        # Read and display output line by line as it comes in
-        for line in process.stdout:
-            output_text.append(line.rstrip())
-            # Update the container with accumulated output
-            with output_container.container():
-                st.code('\n'.join(output_text), language='text')
+        # Run in this interpreter instead of spawning a second Python process. Output
+        # goes through the log callback, not stdout, so other sessions' prints stay put
+        success = analyzer.main(log=output.print)
+        output_container.code(output.getvalue(), language='text')
         
-        # Wait for the process to complete
-        returncode = process.wait()
-        
-        if returncode == 0:
+        if success:
             st.success("✓ Market data fetched and database updated successfully!")
         else:
-            st.error(f"✗ Analyzer exited with error code: {returncode}")
+            st.error("✗ Analyzer did not complete; see the output above")
             
-    except FileNotFoundError:
-        st.error("✗ run_analyzer.py not found in the same directory")
     except Exception as e:
         st.error(f"✗ Unexpected error running analyzer: {str(e)}")
+    finally:
+        lock.release()
 
 def load_market_data_from_api():
     """Fetch fresh market data from Capital.com API"""
@@ -225,11 +261,34 @@ def load_market_data_from_api():
         st.error(f"Error fetching API data: {str(e)}")
         return None
 
+def get_data_mtime():
+    """Modification time of the database file, used to key cached loads"""
+    try:
+        return os.path.getmtime(database.DB_FILE)
+    except OSError:
+        return 0.0
+
 @st.cache_data
-def load_market_data():
+def read_market_data(mtime: float):
+    """
+    Read the markets table without rendering anything
+    
+    mtime is only a cache key: a rewritten database gets a new mtime and
+    triggers exactly one reload. Cached helpers build on this rather than
+    load_market_data so they don't replay its status messages.
+    
+    Text columns are Arrow-backed strings when pyarrow is installed (the
+    default from pandas 3). The option is only set around this read, so
+    the analyzer running in the same process keeps its own dtypes.
+    """
+    with pd.option_context('future.infer_string', True) if ARROW_STRINGS else contextlib.nullcontext():
+        return database.load_market_data_df()
+
+@st.cache_data
+def load_market_data(mtime: float):
     """Load market data from SQLite database"""
     try:
-        df = database.load_market_data_df()
+        df = read_market_data(mtime)
         if df is None:
             st.error("[DEBUG] database.load_market_data_df() returned None")
         elif len(df) == 0:
@@ -250,68 +309,285 @@ def initialize_session_state():
     if 'search_term' not in st.session_state:
         st.session_state.search_term = ""
 
-def parse_percentage(value):
-    """Parse percentage string to float"""
-    if pd.isna(value):
-        return np.nan
-    if isinstance(value, str):
-        try:
-            return float(value.replace('%', '').strip())
-        except (ValueError, AttributeError):
-            return np.nan
-    return float(value)
-
-def format_perf_columns(df):
-    """Convert performance string columns to numeric for calculations"""
-    df_numeric = df.copy()
-    # Convert all percentage columns (Perf % and Price Change %)
-    percentage_cols = [col for col in df_numeric.columns if '%' in col]
-    for col in percentage_cols:
-        if col in df_numeric.columns:
-            df_numeric[col] = df_numeric[col].apply(parse_percentage)
-    return df_numeric
+@st.cache_data
+def numeric_market_data(mtime):
+    """
+    Market data with every percentage column as float32, parsed once per data version
+    
+    The database already stores REAL columns; any text values such as
+    "1.23%" or "N/A" are converted with vectorized string ops. Percentages
+    are shown to two decimals, well within float32 precision, and the
+    narrower columns halve the memory every mean/max/ranking reads.
+    """
+    df = read_market_data(mtime)
+    
+    def as_float32(col):
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values.astype(str).str.rstrip('%').str.strip(), errors='coerce')
+        return values.astype('float32')
+    
+    # assign() only builds the replaced columns; the text columns are shared, not copied
+    return df.assign(**{col: as_float32(col) for col in df.columns if '%' in col})
 
-def main():
-    # Initialize session state
-    initialize_session_state()
-    
-    # Display header
-    st.header("📊 Capital.com Market Analyzer")
-    
-    # Check if we need to fetch fresh data
-    if should_fetch_fresh_data():
-        st.markdown("Starting up - fetching latest market data...")
-        with st.spinner("Fetching market data from Capital.com API..."):
-            run_analyzer()
-    else:
-        st.markdown("Using cached market data from today...")
-        st.info("ℹ️ Data was already fetched today. Run again tomorrow for fresh data, or manually delete the database to force a fresh fetch.")
-    
-    # Get last updated time
-    last_updated = database.get_last_updated()
-    if not last_updated:
-        last_updated = "Unknown"
-    
-    # Load market data from database
-    df = load_market_data()
-    
-    # Display subtitle
-    st.markdown(f"Real-time market performance tracking across multiple asset classes | **Data Source:** 💾 Database | **Last Updated:** {last_updated}")
-    
-    if df is None or len(df) == 0:
-        st.warning("⚠️ No data available")
-        st.info("""
-        ### To populate data:
-        1. Configure your API credentials in `config.py`
-        2. Run `python run_analyzer.py` to fetch market data
-        3. This will populate the SQLite database
-        4. Refresh this page to see the data
-        """)
-        return
-    
-    # Convert performance columns to numeric for calculations
-    df_numeric = format_perf_columns(df)
-    
+@st.cache_data
+def search_columns(mtime):
+    """Lowercased Name and Symbol arrays, built once per data version for searching"""
+    df = read_market_data(mtime)
+    return tuple(
+        df[col].fillna('').astype(str).str.lower().to_numpy(dtype=str)
+        for col in ('Name', 'Symbol')
+    )
+
+@st.cache_data
+def filter_market_data(mtime, category, search_term):
+    """
+    Apply the category and search filters to the numeric market data
+    
+    Both filters are combined into one boolean mask and applied once. The
+    search is a case-insensitive substring match on Name or Symbol.
+    """
+    df_numeric = numeric_market_data(mtime)
+    if category == "All" and not search_term:
+        return df_numeric
+    
+    mask = np.ones(len(df_numeric), dtype=bool)
+    if 'Category' in df_numeric.columns and category != "All":
+        mask &= (df_numeric['Category'] == category).to_numpy()
+    
+    if search_term:
+        term = search_term.lower()
+        names_lower, symbols_lower = search_columns(mtime)
+        mask &= (np.char.find(names_lower, term) >= 0) | (np.char.find(symbols_lower, term) >= 0)
+    
+    return df_numeric.loc[mask]
+
+@st.cache_data
+def perf_by_category(mtime, category, search_term, perf_col='Perf % 1M'):
+    """Average performance per category for the current filter state, highest first"""
+    filtered_df = filter_market_data(mtime, category, search_term)
+    perf_by_cat = filtered_df.groupby('Category', observed=True)[perf_col].mean().sort_values(ascending=False)
+    return perf_by_cat[perf_by_cat.notna()]  # Remove NaN values
+
+@st.cache_data
+def sorted_by_performance(mtime, category, search_term, perf_col):
+    """
+    Markets with a value for perf_col, sorted best first
+    
+    Sorted once per data version and filter state; the per-category
+    top lists are taken from the result.
+    """
+    filtered_df = filter_market_data(mtime, category, search_term)
+    ranked = filtered_df[['Name', 'Symbol', perf_col]].dropna(subset=[perf_col])
+    return ranked.sort_values(perf_col, ascending=False, kind='mergesort')
+
+# Match the .positive / .negative CSS classes
+POSITIVE_COLOR = '#3fb950'
+NEGATIVE_COLOR = '#f85149'
+
+# Top Performers tabs: label -> performance column
+PERFORMANCE_TABS = {
+    '1 Week': 'Perf % 1W',
+    '1 Month': 'Perf % 1M',
+    '3 Months': 'Perf % 3M',
+    '1 Year': 'Perf % 1Y',
+}
+
+@st.cache_data
+def performance_summary(mtime, category, search_term):
+    """
+    Top 10, bottom 5 and per-category top 5 markets for every tab timeframe
+    
+    All tab bodies render on each rerun, so they read from this cached
+    summary instead of ranking the filtered data themselves.
+    """
+    filtered_df = filter_market_data(mtime, category, search_term)
+    summary = {}
+    for perf_col in PERFORMANCE_TABS.values():
+        if perf_col not in filtered_df.columns:
+            continue
+        values = filtered_df[perf_col].to_numpy()
+        columns = ['Name', 'Symbol', perf_col]
+        summary[perf_col] = {
+            'top': filtered_df.iloc[top_k_positions(values, 10)][columns],
+            'bottom': filtered_df.iloc[top_k_positions(-values, 5)][columns],
+        }
+        # The per-category breakdown needs a full ranking, and is only shown for "All"
+        if category == "All" and 'Category' in filtered_df.columns:
+            ranked = sorted_by_performance(mtime, category, search_term, perf_col)
+            summary[perf_col]['by_category'] = top_n_per_category(
+                ranked, filtered_df.loc[ranked.index, 'Category']
+            )
+    return summary
+
+def top_n_per_category(ranked, categories, n=5):
+    """
+    Split a best-first ranking into the first n rows of each category
+    
+    Works on the categorical codes: a stable argsort groups the rows by
+    category while keeping their ranking order, so each group's top n is a
+    prefix found in one linear pass.
+    """
+    cats = pd.Categorical(categories)
+    order = np.argsort(cats.codes, kind='stable')
+    order = order[cats.codes[order] >= 0]  # Drop rows without a category (code -1)
+    codes = cats.codes[order]
+    rank_in_group = np.arange(len(codes)) - np.searchsorted(codes, codes)
+    keep = order[rank_in_group < n]
+    kept_codes = cats.codes[keep]
+    
+    bounds = np.flatnonzero(np.diff(kept_codes)) + 1
+    return {
+        cats.categories[group_codes[0]]: ranked.iloc[rows]
+        for rows, group_codes in zip(np.split(keep, bounds), np.split(kept_codes, bounds))
+        if len(rows)
+    }
+
+def performer_list(ranked):
+    """Markdown ordered list of (Name, Symbol, perf) rows, coloured by sign"""
+    return "\n".join(
+        f"{idx}. {name} ({symbol}) - <span class='{'positive' if perf > 0 else 'negative'}'>{perf:.2f}%</span>"
+        for idx, (name, symbol, perf) in enumerate(ranked.itertuples(index=False), 1)
+    )
+
+def style_performance(ranked, perf_col):
+    """Format a ranked performers table: 2dp percentages, green gains and red losses"""
+    return ranked.style.format({perf_col: '{:.2f}%'}).map(
+        lambda v: f"color: {POSITIVE_COLOR if v > 0 else NEGATIVE_COLOR}", subset=[perf_col]
+    )
+
+@st.cache_data
+def column_counts(mtime, category, search_term, column):
+    """Number of markets per value of a column for the current filter state"""
+    filtered_df = filter_market_data(mtime, category, search_term)
+    counts = filtered_df[column].value_counts()
+    return counts[counts > 0]  # Categoricals also count values filtered out
+
+@st.cache_data
+def timeframe_averages(mtime, category, search_term):
+    """Average performance for each timeframe column for the current filter state"""
+    filtered_df = filter_market_data(mtime, category, search_term)
+    perf_columns = [col for col in filtered_df.columns if col.startswith('Perf %')]
+    # One reduction over all timeframe columns; the parsed columns are already numeric
+    averages = filtered_df[perf_columns].mean()
+    return {
+        col.replace('Perf % ', ''): avg_val
+        for col, avg_val in averages.items()
+        if pd.notna(avg_val) and not np.isinf(avg_val)
+    }
+
+@st.cache_data
+def headline_stats(mtime, category, search_term):
+    """
+    Values for the metrics row, from one pass over the filtered data
+    
+    Returns:
+        Dict with 'total', 'categories', 'best_1m' and 'avg_change'; the
+        last two are None when the column is missing or has no values
+    """
+    filtered_df = filter_market_data(mtime, category, search_term)
+    aggregations = {col: func for col, func in (('Perf % 1M', 'max'), ('Price Change %', 'mean'))
+                    if col in filtered_df.columns}
+    reduced = filtered_df.agg(aggregations) if aggregations else pd.Series(dtype=float)
+    
+    def finite(col):
+        value = reduced.get(col, np.nan)
+        return float(value) if pd.notna(value) and not np.isinf(value) else None
+    
+    return {
+        'total': len(filtered_df),
+        'categories': len(column_counts(mtime, category, search_term, 'Category')) if 'Category' in filtered_df.columns else 0,
+        'best_1m': finite('Perf % 1M'),
+        'avg_change': finite('Price Change %'),
+    }
+
+# Chart builders: figures are cached per data version and filter state so
+# reruns from unrelated widgets reuse them instead of rebuilding
+
+@st.cache_data
+def category_performance_figure(mtime, category, search_term):
+    """Horizontal bar of average 1-month performance per category, or None if empty"""
+    perf_by_cat = perf_by_category(mtime, category, search_term)
+    if len(perf_by_cat) == 0:
+        return None
+    fig = px.bar(
+        x=perf_by_cat.values,
+        y=perf_by_cat.index,
+        title="Avg 1-Month Performance by Category",
+        labels={'x': 'Performance (%)', 'y': 'Category'},
+        orientation='h',
+        color=perf_by_cat.values,
+        color_continuous_scale=['#FF4B4B', '#FFD700', '#00D084']
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data
+def category_share_figure(mtime, category, search_term):
+    """Pie of market counts per category"""
+    category_counts = column_counts(mtime, category, search_term, 'Category')
+    fig = px.pie(
+        values=category_counts.values,
+        names=category_counts.index,
+        title="Markets Distribution by Category"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data
+def timeframe_figure(mtime, category, search_term, category_label):
+    """Bar of average performance per timeframe, or None if no averages"""
+    timeframe_avg = timeframe_averages(mtime, category, search_term)
+    if not timeframe_avg:
+        return None
+    timeframe_df = pd.DataFrame(list(timeframe_avg.items()), columns=['Timeframe', 'Avg Performance'])
+    fig = px.bar(
+        timeframe_df,
+        x='Timeframe',
+        y='Avg Performance',
+        title=f"Average Performance Across All Timeframes - {category_label}",
+        color='Avg Performance',
+        color_continuous_scale=['#FF4B4B', '#FFD700', '#00D084'],
+        labels={'Avg Performance': 'Performance (%)'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data
+def status_figure(mtime, category, search_term, category_label):
+    """Bar of market counts per market status"""
+    status_dist = column_counts(mtime, category, search_term, 'Market Status')
+    fig = px.bar(
+        x=status_dist.index,
+        y=status_dist.values,
+        title=f"Markets by Status - {category_label}",
+        labels={'x': 'Status', 'y': 'Count'},
+        color=status_dist.index
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_data
+def currency_figure(mtime, category, search_term, category_label):
+    """Bar of the 10 most common quote currencies"""
+    currency_dist = column_counts(mtime, category, search_term, 'Currency').head(10)
+    fig = px.bar(
+        x=currency_dist.index,
+        y=currency_dist.values,
+        title=f"Top 10 Currencies - {category_label}",
+        labels={'x': 'Currency', 'y': 'Count'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.fragment
+def render_dashboard(mtime, df):
+    """
+    Render everything driven by the category and search filters
+    
+    Runs as a fragment, so changing a filter reruns only this section
+    instead of the whole script (fetch check, header and loader included).
+    """
     # Filters (moved before metrics)
     st.markdown("---")
     
@@ -319,7 +595,8 @@ def main():
     
     # Always create widgets to avoid duplicate key errors
     with col_filter1:
-        categories_list = ["All"] + sorted(df['Category'].unique().tolist()) if 'Category' in df.columns else ["All"]
+        # Category is loaded as a categorical, whose categories are already unique and sorted
+        categories_list = ["All"] + df['Category'].cat.categories.tolist() if 'Category' in df.columns else ["All"]
         try:
             current_idx = categories_list.index(st.session_state.selected_category)
         except ValueError:
@@ -344,51 +621,32 @@ def main():
             st.session_state.search_term = search_input
     
     # Apply filters using session state
-    filtered_df = df.copy()
-    filtered_df_numeric = df_numeric.copy()
-    
-    if 'Category' in filtered_df.columns and st.session_state.selected_category != "All":
-        mask = filtered_df['Category'] == st.session_state.selected_category
-        filtered_df = filtered_df[mask]
-        filtered_df_numeric = filtered_df_numeric[mask]
-    
-    if st.session_state.search_term:
-        mask = (filtered_df['Name'].str.contains(st.session_state.search_term, case=False, na=False) | 
-                filtered_df['Symbol'].str.contains(st.session_state.search_term, case=False, na=False))
-        filtered_df = filtered_df[mask]
-        filtered_df_numeric = filtered_df_numeric[mask]
+    filter_key = (mtime, st.session_state.selected_category, st.session_state.search_term)
+    filtered_df = filter_market_data(*filter_key)
     
     # Statistics Dashboard (using filtered data)
     st.markdown("---")
     col1, col2, col3, col4 = st.columns(4)
     
+    stats = headline_stats(*filter_key)
+    
     with col1:
-        st.metric("Total Markets", len(filtered_df))
+        st.metric("Total Markets", stats['total'])
     
     with col2:
         if st.session_state.selected_category == "All":
-            categories = filtered_df['Category'].nunique() if 'Category' in filtered_df.columns else 0
-            st.metric("Categories", categories)
+            st.metric("Categories", stats['categories'])
         else:
             # Show category name when filtered
             st.metric("Category", st.session_state.selected_category)
     
     with col3:
-        if 'Perf % 1M' in filtered_df_numeric.columns:
-            top_perf = filtered_df_numeric['Perf % 1M'].max()
-            st.metric("Best Monthly Return", f"{top_perf:.2f}%" if pd.notna(top_perf) and not np.isinf(top_perf) else "N/A")
-        else:
-            st.metric("Best Monthly Return", "N/A")
+        best_1m = stats['best_1m']
+        st.metric("Best Monthly Return", f"{best_1m:.2f}%" if best_1m is not None else "N/A")
     
     with col4:
-        if 'Price Change %' in filtered_df_numeric.columns:
-            try:
-                avg_change = filtered_df_numeric['Price Change %'].mean()
-                st.metric("Avg Price Change", f"{avg_change:.2f}%" if pd.notna(avg_change) and not np.isinf(avg_change) else "N/A")
-            except (TypeError, ValueError):
-                st.metric("Avg Price Change", "N/A")
-        else:
-            st.metric("Avg Price Change", "N/A")
+        avg_change = stats['avg_change']
+        st.metric("Avg Price Change", f"{avg_change:.2f}%" if avg_change is not None else "N/A")
     
     # Define all columns from run_analyzer.py
     all_columns = [
@@ -404,8 +662,13 @@ def main():
     # Display data table
     st.markdown(f"### 📋 Markets Data ({len(filtered_df)} results)")
     
-    display_df = filtered_df[available_cols].copy()
-    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    # Show numeric percentages and let the frontend format them
+    display_df = filtered_df[available_cols]
+    percent_config = {
+        col: st.column_config.NumberColumn(col, format="%.2f%%")
+        for col in available_cols if '%' in col
+    }
+    st.dataframe(display_df, use_container_width=True, hide_index=True, column_config=percent_config)
     
     # Performance Analysis Charts
     st.markdown("---")
@@ -413,71 +676,32 @@ def main():
     st.markdown(f"### 📈 Performance Analysis - {category_label}")
     
     # Get performance columns
-    perf_columns = [col for col in filtered_df_numeric.columns if col.startswith('Perf %')]
+    perf_columns = [col for col in filtered_df.columns if col.startswith('Perf %')]
     
     # Chart 1: Average performance by category (only show when All is selected)
     if st.session_state.selected_category == "All":
         col_chart1, col_chart2 = st.columns(2)
         
         with col_chart1:
-            if 'Perf % 1M' in filtered_df_numeric.columns and 'Category' in filtered_df.columns:
+            if 'Perf % 1M' in filtered_df.columns and 'Category' in filtered_df.columns:
                 try:
-                    perf_by_cat = filtered_df_numeric.groupby(filtered_df['Category'])['Perf % 1M'].mean().sort_values(ascending=False)
-                    perf_by_cat = perf_by_cat[perf_by_cat.notna()]  # Remove NaN values
-                    if len(perf_by_cat) > 0:
-                        fig = px.bar(
-                            x=perf_by_cat.values,
-                            y=perf_by_cat.index,
-                            title="Avg 1-Month Performance by Category",
-                            labels={'x': 'Performance (%)', 'y': 'Category'},
-                            orientation='h',
-                            color=perf_by_cat.values,
-                            color_continuous_scale=['#FF4B4B', '#FFD700', '#00D084']
-                        )
-                        fig.update_layout(height=400)
+                    fig = category_performance_figure(*filter_key)
+                    if fig is not None:
                         st.plotly_chart(fig, use_container_width=True)
                 except Exception as e:
                     st.warning("Could not generate category performance chart")
         
         with col_chart2:
             if 'Category' in filtered_df.columns:
-                category_counts = filtered_df['Category'].value_counts()
-                fig = px.pie(
-                    values=category_counts.values,
-                    names=category_counts.index,
-                    title="Markets Distribution by Category"
-                )
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(category_share_figure(*filter_key), use_container_width=True)
     
     # Chart 3: Performance comparison across timeframes
     st.markdown("### ⏱️ Multi-Timeframe Performance Comparison")
     
     if perf_columns:
-        # Calculate average performance for each timeframe
-        timeframe_avg = {}
-        for col in perf_columns:
-            try:
-                avg_val = pd.to_numeric(filtered_df_numeric[col], errors='coerce').mean()
-                if pd.notna(avg_val) and not np.isinf(avg_val):
-                    timeframe_avg[col.replace('Perf % ', '')] = avg_val
-            except:
-                pass
-        
-        if timeframe_avg:
-            timeframe_df = pd.DataFrame(list(timeframe_avg.items()), columns=['Timeframe', 'Avg Performance'])
-            chart_title = f"Average Performance Across All Timeframes - {category_label}"
-            
-            fig = px.bar(
-                timeframe_df,
-                x='Timeframe',
-                y='Avg Performance',
-                title=chart_title,
-                color='Avg Performance',
-                color_continuous_scale=['#FF4B4B', '#FFD700', '#00D084'],
-                labels={'Avg Performance': 'Performance (%)'}
-            )
-            fig.update_layout(height=400)
+        # Average performance for each timeframe
+        fig = timeframe_figure(*filter_key, category_label)
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
     
     # Top/Bottom performers
@@ -486,133 +710,50 @@ def main():
     st.markdown(performers_title)
     
     # Create tabs for different timeframes
-    tab_1w, tab_1m, tab_3m, tab_1y = st.tabs(["1 Week", "1 Month", "3 Months", "1 Year"])
+    tabs = st.tabs(list(PERFORMANCE_TABS))
+    summary = performance_summary(*filter_key)
     
     def show_top_by_category(perf_col):
         """Show top 5 performers from each category"""
-        if perf_col in filtered_df_numeric.columns and 'Category' in filtered_df.columns:
-            categories = filtered_df['Category'].unique()
+        if perf_col in filtered_df.columns and 'Category' in filtered_df.columns:
+            categories = filtered_df['Category'].unique().tolist()
             
             # Only show category breakdown if "All" is selected and there are multiple categories
             if st.session_state.selected_category == "All" and len(categories) > 1:
+                by_category = summary[perf_col]['by_category']
+                sections = []
                 for category in sorted(categories):
-                    cat_mask = filtered_df['Category'] == category
-                    cat_data = filtered_df_numeric[cat_mask]
-                    
-                    if len(cat_data) > 0:
-                        st.markdown(f"**{category.upper()}**")
-                        top_performers = cat_data.nlargest(5, perf_col)[['Name', 'Symbol', perf_col]]
-                        
-                        for idx, (i, row) in enumerate(top_performers.iterrows(), 1):
-                            perf = row[perf_col]
-                            if pd.notna(perf):
-                                color_class = 'positive' if perf > 0 else 'negative'
-                                st.write(f"{idx}. {row['Name']} ({row['Symbol']}) - <span class='{color_class}'>{perf:.2f}%</span>", unsafe_allow_html=True)
-                        st.write("")  # Add spacing between categories
+                    # Categories with no values for this timeframe only get a heading
+                    sections.append(f"**{category.upper()}**")
+                    if category in by_category:
+                        sections.append(performer_list(by_category[category]))
+                st.markdown("\n\n".join(sections), unsafe_allow_html=True)
             else:
                 # Show top performers for the selected category
-                top_performers = filtered_df_numeric.nlargest(10, perf_col)[['Name', 'Symbol', perf_col]]
-                for idx, (i, row) in enumerate(top_performers.iterrows(), 1):
-                    perf = row[perf_col]
-                    if pd.notna(perf):
-                        color_class = 'positive' if perf > 0 else 'negative'
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}) - <span class='{color_class}'>{perf:.2f}%</span>", unsafe_allow_html=True)
-    
-    with tab_1w:
-        st.markdown("#### 🚀 Top 5 Performers in Each Category (1 Week)")
-        show_top_by_category('Perf % 1W')
-        
-        st.markdown("---")
-        st.markdown("#### 📊 Overall Top 5 Gainers & Losers")
-        col_top, col_bot = st.columns(2)
-        if 'Perf % 1W' in filtered_df_numeric.columns:
-            with col_top:
-                top_5 = filtered_df_numeric.nlargest(5, 'Perf % 1W')[['Name', 'Symbol', 'Perf % 1W']]
-                st.markdown("**Top 5 Gainers**")
-                for idx, (i, row) in enumerate(top_5.iterrows(), 1):
-                    perf = row['Perf % 1W']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='positive'>{perf:.2f}%</span>", unsafe_allow_html=True)
-            
-            with col_bot:
-                bottom_5 = filtered_df_numeric.nsmallest(5, 'Perf % 1W')[['Name', 'Symbol', 'Perf % 1W']]
-                st.markdown("**Top 5 Losers**")
-                for idx, (i, row) in enumerate(bottom_5.iterrows(), 1):
-                    perf = row['Perf % 1W']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='negative'>{perf:.2f}%</span>", unsafe_allow_html=True)
-    
-    with tab_1m:
-        st.markdown("#### 🚀 Top 5 Performers in Each Category (1 Month)")
-        show_top_by_category('Perf % 1M')
-        
-        st.markdown("---")
-        st.markdown("#### 📊 Overall Top 5 Gainers & Losers")
-        col_top, col_bot = st.columns(2)
-        if 'Perf % 1M' in filtered_df_numeric.columns:
-            with col_top:
-                top_5 = filtered_df_numeric.nlargest(5, 'Perf % 1M')[['Name', 'Symbol', 'Perf % 1M']]
-                st.markdown("**Top 5 Gainers**")
-                for idx, (i, row) in enumerate(top_5.iterrows(), 1):
-                    perf = row['Perf % 1M']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='positive'>{perf:.2f}%</span>", unsafe_allow_html=True)
-            
-            with col_bot:
-                bottom_5 = filtered_df_numeric.nsmallest(5, 'Perf % 1M')[['Name', 'Symbol', 'Perf % 1M']]
-                st.markdown("**Top 5 Losers**")
-                for idx, (i, row) in enumerate(bottom_5.iterrows(), 1):
-                    perf = row['Perf % 1M']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='negative'>{perf:.2f}%</span>", unsafe_allow_html=True)
-    
-    with tab_3m:
-        st.markdown("#### 🚀 Top 5 Performers in Each Category (3 Months)")
-        show_top_by_category('Perf % 3M')
-        
-        st.markdown("---")
-        st.markdown("#### 📊 Overall Top 5 Gainers & Losers")
+                st.markdown(performer_list(summary[perf_col]['top']), unsafe_allow_html=True)
+    
+    def show_gainers_and_losers(perf_col):
+        """Show the overall top 5 gainers and losers for a timeframe"""
         col_top, col_bot = st.columns(2)
-        if 'Perf % 3M' in filtered_df_numeric.columns:
+        if perf_col in filtered_df.columns:
             with col_top:
-                top_5 = filtered_df_numeric.nlargest(5, 'Perf % 3M')[['Name', 'Symbol', 'Perf % 3M']]
                 st.markdown("**Top 5 Gainers**")
-                for idx, (i, row) in enumerate(top_5.iterrows(), 1):
-                    perf = row['Perf % 3M']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='positive'>{perf:.2f}%</span>", unsafe_allow_html=True)
+                top_5 = summary[perf_col]['top'].head(5)
+                st.dataframe(style_performance(top_5, perf_col), hide_index=True, use_container_width=True)
             
             with col_bot:
-                bottom_5 = filtered_df_numeric.nsmallest(5, 'Perf % 3M')[['Name', 'Symbol', 'Perf % 3M']]
                 st.markdown("**Top 5 Losers**")
-                for idx, (i, row) in enumerate(bottom_5.iterrows(), 1):
-                    perf = row['Perf % 3M']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='negative'>{perf:.2f}%</span>", unsafe_allow_html=True)
-    
-    with tab_1y:
-        st.markdown("#### 🚀 Top 5 Performers in Each Category (1 Year)")
-        show_top_by_category('Perf % 1Y')
-        
-        st.markdown("---")
-        st.markdown("#### 📊 Overall Top 5 Gainers & Losers")
-        col_top, col_bot = st.columns(2)
-        if 'Perf % 1Y' in filtered_df_numeric.columns:
-            with col_top:
-                top_5 = filtered_df_numeric.nlargest(5, 'Perf % 1Y')[['Name', 'Symbol', 'Perf % 1Y']]
-                st.markdown("**Top 5 Gainers**")
-                for idx, (i, row) in enumerate(top_5.iterrows(), 1):
-                    perf = row['Perf % 1Y']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='positive'>{perf:.2f}%</span>", unsafe_allow_html=True)
+                bottom_5 = summary[perf_col]['bottom']
+                st.dataframe(style_performance(bottom_5, perf_col), hide_index=True, use_container_width=True)
+    
+    for tab, (label, perf_col) in zip(tabs, PERFORMANCE_TABS.items()):
+        with tab:
+            st.markdown(f"#### 🚀 Top 5 Performers in Each Category ({label})")
+            show_top_by_category(perf_col)
             
-            with col_bot:
-                bottom_5 = filtered_df_numeric.nsmallest(5, 'Perf % 1Y')[['Name', 'Symbol', 'Perf % 1Y']]
-                st.markdown("**Top 5 Losers**")
-                for idx, (i, row) in enumerate(bottom_5.iterrows(), 1):
-                    perf = row['Perf % 1Y']
-                    if pd.notna(perf):
-                        st.write(f"{idx}. {row['Name']} ({row['Symbol']}): <span class='negative'>{perf:.2f}%</span>", unsafe_allow_html=True)
+            st.markdown("---")
+            st.markdown("#### 📊 Overall Top 5 Gainers & Losers")
+            show_gainers_and_losers(perf_col)
     
     # Market Status Distribution
     st.markdown("---")
@@ -622,28 +763,56 @@ def main():
     
     with col_status1:
         if 'Market Status' in filtered_df.columns:
-            status_dist = filtered_df['Market Status'].value_counts()
-            fig = px.bar(
-                x=status_dist.index,
-                y=status_dist.values,
-                title=f"Markets by Status - {category_label}",
-                labels={'x': 'Status', 'y': 'Count'},
-                color=status_dist.index
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(status_figure(*filter_key, category_label), use_container_width=True)
     
     with col_status2:
         if 'Currency' in filtered_df.columns:
-            currency_dist = filtered_df['Currency'].value_counts().head(10)
-            fig = px.bar(
-                x=currency_dist.index,
-                y=currency_dist.values,
-                title=f"Top 10 Currencies - {category_label}",
-                labels={'x': 'Currency', 'y': 'Count'}
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(currency_figure(*filter_key, category_label), use_container_width=True)
+
+def main():
+    # Initialize session state
+    initialize_session_state()
+    
+    # Display header
+    st.header("📊 Capital.com Market Analyzer")
+    
+    # Read the last fetch time once; it only changes if we fetch below
+    last_updated = database.get_last_updated()
+    
+    # Check if we need to fetch fresh data
+    if should_fetch_fresh_data(last_updated):
+        st.markdown("Starting up - fetching latest market data...")
+        with st.spinner("Fetching market data from Capital.com API..."):
+            run_analyzer()
+        last_updated = database.get_last_updated()
+    else:
+        st.markdown("Using cached market data from today...")
+        st.info("ℹ️ Data was already fetched today. Run again tomorrow for fresh data, or manually delete the database to force a fresh fetch.")
+    
+    if not last_updated:
+        last_updated = "Unknown"
+    
+    # Load market data from database
+    mtime = get_data_mtime()
+    df = load_market_data(mtime)
+    
+    # Display subtitle
+    st.markdown(f"Real-time market performance tracking across multiple asset classes | **Data Source:** 💾 Database | **Last Updated:** {last_updated}")
+    
+    if df is None or len(df) == 0:
+        st.warning("⚠️ No data available")
+        st.info("""
+        ### To populate data:
+        1. Configure your API credentials in `config.py`
+        2. Run `python run_analyzer.py` to fetch market data
+        3. This will populate the SQLite database
+        4. Refresh this page to see the data
+        """)
+        return
+    
+    # Filters, metrics, table, charts and tabs; widget changes rerun only this part
+    render_dashboard(mtime, df)
+    
     st.markdown("---")
     st.markdown("""
     ### About
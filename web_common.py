@@ -0,0 +1,143 @@
+"""
+Flask helpers shared by the web viewer and the web app
+"""
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+import gzip
+import hashlib
+import os
+import zlib
+
+try:
+    import orjson  # Optional: faster JSON serialization
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # Optional: smaller precompressed API bodies
+except ImportError:
+    brotli = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify() runs in C"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def use_fast_json(app):
+    """Serialize the app's JSON with orjson when it's installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+class VersionedCache:
+    """Values computed at most once per version of a file"""
+    
+    def __init__(self, path):
+        self.path = path
+        # (file version, values computed from it), replaced whole when the file changes.
+        # False never equals a real version (or None for a missing file), forcing the first load.
+        self._snapshot = (False, {})
+    
+    def version(self):
+        """(mtime_ns, size) of the file, or None if it doesn't exist"""
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    def get(self, key, build):
+        """
+        Return build(), computed at most once per file version
+        
+        Args:
+            key: Cache key for the value
+            build: Called with no arguments when the value isn't cached yet
+        """
+        version = self.version()
+        if self._snapshot[0] != version:
+            self._snapshot = (version, {})
+        values = self._snapshot[1]
+        if key not in values:
+            values[key] = build()
+        return values[key]
+    
+    def clear(self):
+        """Drop every cached value, e.g. after writing the file within one mtime tick"""
+        self._snapshot = (False, {})
+
+
+def encode_payload(body):
+    """
+    Prepare a response body for caching
+    
+    Returns:
+        (ETag, body, {encoding: compressed body}) with gzip, plus brotli
+        when it's installed
+    """
+    encoded = {'gzip': gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=5)
+    return hashlib.md5(body).hexdigest(), body, encoded
+
+
+def gzip_stream(chunks):
+    """
+    Gzip a streamed body on the fly
+    
+    Each chunk is flushed as soon as it's compressed, so the client
+    receives data at the same pace as the uncompressed stream.
+    
+    Args:
+        chunks: Iterable of str (UTF-8 encoded) or bytes
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def best_encoding(available):
+    """
+    Pick the content encoding to send, or None for the identity body
+    
+    The highest q-value the client gives wins (so 'gzip;q=0' opts out),
+    with brotli preferred on a tie.
+    """
+    return request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in available])
+
+
+def conditional_response(body, etag, mimetype='application/json', encoded=None, **cache_control):
+    """
+    Wrap an API body with caching headers, answering 304 when the ETag matches
+    
+    Args:
+        body: Raw response body (bytes or an iterable of chunks)
+        etag: Strong ETag for the raw body
+        mimetype: Content type of the body
+        encoded: Optional {encoding: compressed body}; the best one the
+                 client accepts is sent instead, under its own ETag
+        **cache_control: Cache-Control directives, e.g. max_age=60
+    """
+    headers = {'Vary': 'Accept-Encoding'}
+    encoded = encoded or {}
+    encoding = best_encoding(encoded)
+    if encoding:
+        body = encoded[encoding]
+        etag += f'-{encoding}'
+        headers['Content-Encoding'] = encoding
+    response = Response(body, mimetype=mimetype, headers=headers)
+    for directive, value in cache_control.items():
+        setattr(response.cache_control, directive, value)
+    response.set_etag(etag)
+    return response.make_conditional(request)
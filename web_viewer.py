@@ -2,16 +2,86 @@
 Web-based viewer for Capital.com market analysis results
 """
 
-from flask import Flask, render_template, jsonify
-import os
+from flask import Flask, render_template, jsonify, request, abort
+import hashlib
 from datetime import datetime
 import database  # Import database module
+from web_common import VersionedCache, conditional_response, encode_payload, use_fast_json
+
+try:
+    import waitress  # Optional: multithreaded production WSGI server
+except ImportError:
+    waitress = None
+
+try:
+    import pyarrow as pa  # Optional: columnar /api/markets.arrow payload
+except ImportError:
+    pa = None
+
 
 app = Flask(__name__)
+use_fast_json(app)
+
+# Seconds browsers may reuse an API response before asking again
+API_MAX_AGE = 60
+
+# Worker threads handling requests concurrently
+SERVER_THREADS = 8
+
+# Values derived from the database, recomputed when the file changes
+db_cache = VersionedCache(database.DB_FILE)
 
 def load_market_data():
-    """Load market data from SQLite database"""
-    return database.load_market_data_list()
+    """Load market data from SQLite database (parsed once per database version)"""
+    return db_cache.get('markets', database.load_market_data_list)
+
+def cached_payload(name, build, mimetype):
+    """
+    Serve a response body built once per database version
+    
+    Compressed copies (gzip, plus brotli when installed) are made once and
+    cached alongside the raw body, so each request just picks the best
+    encoding the client accepts. Each body carries an ETag, so a
+    conditional GET for an unchanged version gets a 304 with no body at all.
+    
+    Args:
+        name: Cache key for this endpoint
+        build: Called with no arguments, returns the body as bytes
+        mimetype: Content type of the body
+    """
+    etag, body, encoded = db_cache.get(('payload', name), lambda: encode_payload(build()))
+    return conditional_response(body, etag, mimetype, encoded, max_age=API_MAX_AGE)
+
+def query_int(name, default=None):
+    """Read a non-negative integer query parameter, aborting with 400 on anything else"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value) if value.isascii() else -1
+    except ValueError:
+        number = -1
+    if number < 0:
+        abort(400, description=f'{name} must be a non-negative integer')
+    return number
+
+def cached_json(name, build):
+    """
+    Serve a JSON payload serialized once per database version
+    
+    Args:
+        name: Cache key for this endpoint
+        build: Called with no arguments, returns the payload
+    """
+    return cached_payload(name, lambda: jsonify(build()).get_data(), 'application/json')
+
+def arrow_stream():
+    """Serialize the markets list as an Arrow IPC stream (one column per field)"""
+    table = pa.Table.from_pylist(load_market_data())
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 def get_file_stats():
     """Get statistics about the database"""
@@ -25,26 +95,68 @@ def index():
 
 @app.route('/api/markets')
 def get_markets():
-    """API endpoint to get market data"""
-    markets = load_market_data()
-    stats = get_file_stats()
+    """
+    API endpoint to get market data
     
-    return jsonify({
-        'markets': markets,
-        'stats': stats,
-        'count': len(markets)
-    })
+    Optional query parameters:
+        fields: Comma-separated field names to return (see database.MARKET_FIELDS)
+        limit: Maximum number of markets
+        offset: Number of markets to skip
+    
+    Without any of them the full, cached payload is served.
+    """
+    fields = request.args.get('fields')
+    limit = query_int('limit')
+    offset = query_int('offset', 0)
+    if fields or limit is not None or offset:
+        field_list = [f.strip() for f in fields.split(',')] if fields else None
+        unknown = [f for f in field_list or [] if f not in database.MARKET_FIELDS]
+        if unknown:
+            abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+        
+        # Not cached, so the ETag comes from the database version and the normalized query
+        etag = hashlib.md5(repr((db_cache.version(), field_list, limit, offset)).encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            return conditional_response(b'', etag, max_age=API_MAX_AGE)
+        
+        markets = database.load_market_data_list(field_list, limit, offset)
+        body = jsonify({
+            'markets': markets,
+            'stats': get_file_stats(),
+            'count': len(markets),
+            'offset': offset
+        }).get_data()
+        return conditional_response(body, etag, max_age=API_MAX_AGE)
+    
+    def build():
+        markets = load_market_data()
+        return {
+            'markets': markets,
+            'stats': get_file_stats(),
+            'count': len(markets)
+        }
+    
+    return cached_json('markets', build)
+
+@app.route('/api/markets.arrow')
+def get_markets_arrow():
+    """Market data as a columnar Arrow IPC stream (requires pyarrow)"""
+    if pa is None:
+        abort(501, description='pyarrow is not installed')
+    return cached_payload('markets.arrow', arrow_stream,
+                          'application/vnd.apache.arrow.stream')
 
 @app.route('/api/categories')
 def get_categories():
     """Get unique categories"""
-    markets = load_market_data()
-    categories = list(set(m.get('Category', 'Unknown') for m in markets))
+    def build():
+        categories = database.get_categories()
+        return {
+            'categories': categories,
+            'count': len(categories)
+        }
     
-    return jsonify({
-        'categories': sorted(categories),
-        'count': len(categories)
-    })
+    return cached_json('categories', build)
 
 if __name__ == '__main__':
     print("="*60)
@@ -55,4 +167,7 @@ if __name__ == '__main__':
     print("\nPress Ctrl+C to stop the server")
     print("="*60)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if waitress is not None:
+        waitress.serve(app, host='0.0.0.0', port=5000, threads=SERVER_THREADS)
+    else:
+        app.run(debug=False, host='0.0.0.0', port=5000, threaded=True)